@@ -0,0 +1,89 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .metrics import record_cache
+from .response_cache import (cache_is_shared, get_cache_version,
+                             get_viewer_version, normalize_query)
+
+
+def make_etag(*parts):
+    return '"{}"'.format(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def record_conditional(request, response):
+    """Учитывает в метриках запрос с валидаторами: 304 — попадание."""
+    if (
+        'If-None-Match' in request.headers
+        or 'If-Modified-Since' in request.headers
+    ):
+        record_cache('conditional', response is not None)
+
+
+class ConditionalGetMixin:
+    """
+    Заголовки ETag и Last-Modified для list и retrieve.
+
+    Валидаторы считаются до сериализации: из версии группы кеша
+    (см. api.response_cache), версии данных пользователя и того,
+    что возвращают get_list_validators/get_object_validators. При
+    совпадении If-None-Match или If-Modified-Since сразу отдается 304.
+    """
+
+    cache_group = None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, self.get_list_validators, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, self.get_object_validators,
+            request, *args, **kwargs
+        )
+
+    def get_list_validators(self, request, *args, **kwargs):
+        """Возвращает (части ETag, время изменения) для списка."""
+        return (), None
+
+    def get_object_validators(self, request, *args, **kwargs):
+        """Возвращает (части ETag, время изменения) или None для 404."""
+        return (kwargs.get(self.lookup_url_kwarg or self.lookup_field),), None
+
+    def conditional_response(self, handler, validators, request,
+                             *args, **kwargs):
+        if not cache_is_shared():
+            return handler(request, *args, **kwargs)
+        result = validators(request, *args, **kwargs)
+        if result is None:
+            return handler(request, *args, **kwargs)
+        parts, modified = result
+        group_version = get_cache_version(self.cache_group)
+        viewer_version = get_viewer_version(request.user)
+        etag = make_etag(
+            self.cache_group, group_version, viewer_version,
+            request.path, normalize_query(request.query_params),
+            request.accepted_renderer.format, *parts
+        )
+        last_modified = int(max(
+            modified or 0, group_version, viewer_version
+        ))
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        record_conditional(request, response)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        # Устаревший ответ из кеша не должен получить текущий ETag,
+        # иначе клиент сохранит его до следующего изменения.
+        if (
+            response.status_code in (200, 304)
+            and response.get('X-Cache') != 'STALE'
+        ):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Authorization',))
+        return response
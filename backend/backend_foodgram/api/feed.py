@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Recipe
+from user.models import Subscription
+from .metrics import record_cache
+from .replicas import read_primary_if_fresh
+from .response_cache import cache_is_shared
+
+FEED_ORDERING = ('-pub_date', '-id')
+
+
+def feed_version_key(user_id):
+    return f'api_cache:feed:{user_id}'
+
+
+def bump_feed_version(*user_ids):
+    """Помечает устаревшим закешированное начало ленты пользователей."""
+    now = time.time()
+    cache.set_many(
+        {feed_version_key(user_id): now for user_id in user_ids},
+        timeout=None
+    )
+
+
+def get_feed_version(user_id):
+    key = feed_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def filter_feed(queryset, user):
+    """
+    Рецепты авторов, на которых подписан пользователь, новые первыми.
+
+    Один запрос: подписки подставляются подзапросом, рецепты читаются
+    по индексу (author, pub_date).
+    """
+    return queryset.filter(author__in=Subscription.objects.filter(
+        user=user
+    ).values('author_id')).order_by(*FEED_ORDERING)
+
+
+def get_feed_head(user):
+    """
+    Возвращает (id последних FEED_HEAD_SIZE рецептов ленты, признак
+    того, что в них вся лента).
+
+    Список хранится в кеше под версией ленты пользователя; версия
+    меняется, когда автор из подписок публикует или удаляет рецепт
+    и когда меняются сами подписки (см. api.signals).
+    """
+    size = settings.FEED_HEAD_SIZE
+    if not size or not cache_is_shared():
+        return [], False
+    version = get_feed_version(user.id)
+    key = f'{feed_version_key(user.id)}:{version!r}'
+    head = cache.get(key)
+    record_cache('feed_head', head is not None)
+    if head is None:
+        read_primary_if_fresh(version)
+        head = list(
+            filter_feed(Recipe.objects.all(), user).values_list(
+                'id', flat=True
+            )[:size + 1]
+        )
+        cache.set(key, head, settings.API_CACHE_TIMEOUT)
+    return head[:size], len(head) <= size
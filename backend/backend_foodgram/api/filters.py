@@ -1,11 +1,8 @@
+from django.db.models import F
 from django_filters import rest_framework as filter
-from rest_framework.filters import SearchFilter
 
 from recipes.models import Recipe, Tag
-
-
-class IngredientFilter(SearchFilter):
-    search_param = 'name'
+from .search import get_recipe_search
 
 
 class RecipeFilter(filter.FilterSet):
@@ -19,10 +16,21 @@ class RecipeFilter(filter.FilterSet):
     is_favorited = filter.BooleanFilter(method='get_favorite')
     is_in_shopping_cart = filter.BooleanFilter(
         method='get_is_in_shopping_cart')
+    q = filter.CharFilter(method='search')
+    ordering = filter.ChoiceFilter(
+        choices=[
+            ('popular', 'По популярности'),
+            ('trending', 'В тренде'),
+        ],
+        method='order'
+    )
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'q',
+            'ordering'
+        ]
 
     def get_favorite(self, queryset, name, value):
         if value:
@@ -33,3 +41,22 @@ class RecipeFilter(filter.FilterSet):
         if value:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def search(self, queryset, name, value):
+        """Полнотекстовый поиск с сортировкой по релевантности."""
+        if value.strip():
+            return get_recipe_search().search(queryset, value)
+        return queryset
+
+    def order(self, queryset, name, value):
+        """
+        popular — по счетчикам избранного и списков покупок,
+        trending — по рейтингу из TrendingRecipe, только рецепты в нем.
+        """
+        if value == 'trending':
+            return queryset.filter(trending__isnull=False).annotate(
+                trending_score=F('trending__score')
+            ).order_by('-trending_score', '-id')
+        return queryset.order_by(
+            '-favorites_count', '-shopping_cart_count', '-pub_date', '-id'
+        )
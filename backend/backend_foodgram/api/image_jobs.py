@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes.models import ImageJob, Recipe
+from user.models import (IMAGE_FAILED, IMAGE_PENDING, IMAGE_PROCESSING,
+                         IMAGE_READY, FoodgramUser)
+from .images import (AVATAR_DERIVATIVES, RECIPE_DERIVATIVES,
+                     delete_derivatives, generate_derivatives,
+                     normalize_image)
+from .response_cache import bump_cache_version
+
+TARGETS = {
+    ImageJob.RECIPE: (
+        Recipe, 'image', 'image_status', RECIPE_DERIVATIVES
+    ),
+    ImageJob.AVATAR: (
+        FoodgramUser, 'avatar', 'avatar_status', AVATAR_DERIVATIVES
+    ),
+}
+
+
+def enqueue_image_job(kind, object_id):
+    """
+    Ставит изображение в очередь обработки.
+
+    Вызывается в той же транзакции, что и сохранение файла, поэтому
+    воркер не увидит задачу раньше самого объекта.
+    """
+    ImageJob.objects.get_or_create(
+        kind=kind, object_id=object_id, status=IMAGE_PENDING
+    )
+
+
+def claim_job():
+    """Забирает следующую задачу, пропуская занятые другими воркерами."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = ImageJob.objects.select_for_update(skip_locked=True).filter(
+            status=IMAGE_PENDING, run_after__lte=now
+        ).order_by('run_after', 'id').first()
+        if job is None:
+            return None
+        job.status = IMAGE_PROCESSING
+        job.attempts += 1
+        job.locked_at = now
+        job.save(update_fields=['status', 'attempts', 'locked_at'])
+    return job
+
+
+def process(job):
+    """
+    Нормализует изображение и создает копии.
+
+    Все обновления объекта ограничены исходным именем файла: если
+    изображение заменили во время обработки, устаревшая задача ничего
+    не меняет, а новую обработает задача новой загрузки.
+    """
+    model, image_field, status_field, sizes = TARGETS[job.kind]
+    obj = model.objects.filter(pk=job.object_id).only(
+        'id', image_field
+    ).first()
+    if obj is None or not getattr(obj, image_field):
+        return
+    field_file = getattr(obj, image_field)
+    targets = model.objects.filter(
+        pk=job.object_id, **{image_field: field_file.name}
+    )
+    if not targets.update(**{status_field: IMAGE_PROCESSING}):
+        return
+    name = normalize_image(field_file)
+    if name != field_file.name:
+        setattr(obj, image_field, name)
+        field_file = getattr(obj, image_field)
+    generate_derivatives(field_file, sizes)
+    changes = {image_field: name, status_field: IMAGE_READY}
+    if model is Recipe:
+        changes['modified'] = timezone.now()
+    if not targets.update(**changes):
+        delete_derivatives(field_file, sizes)
+        return
+    bump_cache_version('recipes')
+
+
+def fail(job, error):
+    """Откладывает задачу с экспоненциальной задержкой или сдается."""
+    model, _, status_field, _ = TARGETS[job.kind]
+    job.error = f'{type(error).__name__}: {error}'
+    job.locked_at = None
+    if job.attempts >= settings.IMAGE_JOB_MAX_ATTEMPTS:
+        job.status = IMAGE_FAILED
+        model.objects.filter(pk=job.object_id).update(
+            **{status_field: IMAGE_FAILED}
+        )
+    else:
+        job.status = IMAGE_PENDING
+        job.run_after = timezone.now() + timedelta(
+            seconds=settings.IMAGE_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        )
+    job.save(update_fields=['status', 'error', 'locked_at', 'run_after'])
+
+
+def run_job(job):
+    """Выполняет задачу в потоке воркера. Возвращает признак успеха."""
+    try:
+        process(job)
+    except Exception as error:
+        fail(job, error)
+        return False
+    else:
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=IMAGE_READY, error='', locked_at=None
+        )
+        return True
+    finally:
+        connection.close()
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи воркеров, завершившихся аварийно."""
+    return ImageJob.objects.filter(
+        status=IMAGE_PROCESSING,
+        locked_at__lt=timezone.now() - timedelta(
+            seconds=settings.IMAGE_JOB_TIMEOUT
+        ),
+    ).update(status=IMAGE_PENDING, locked_at=None)
+
+
+def retry_failed():
+    """Возвращает в очередь задачи, исчерпавшие попытки."""
+    jobs = ImageJob.objects.filter(status=IMAGE_FAILED)
+    for kind, (model, _, status_field, _) in TARGETS.items():
+        model.objects.filter(
+            pk__in=jobs.filter(kind=kind).values('object_id'),
+            **{status_field: IMAGE_FAILED}
+        ).update(**{status_field: IMAGE_PENDING})
+    return jobs.update(
+        status=IMAGE_PENDING, attempts=0, run_after=timezone.now()
+    )
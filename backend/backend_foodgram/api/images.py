@@ -0,0 +1,256 @@
+import base64
+import binascii
+import posixpath
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from user.models import IMAGE_READY
+
+RECIPE_DERIVATIVES = {
+    'card': (480, 320),
+    'detail': (1200, 800),
+}
+AVATAR_DERIVATIVES = {
+    '64': (64, 64),
+    '128': (128, 128),
+}
+FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+INVALID_IMAGE_MESSAGE = 'Загрузите корректное изображение.'
+
+# Сигнатуры допустимых форматов: (смещение, байты) -> расширение.
+SIGNATURES = (
+    ((0, b'\xff\xd8\xff'), 'jpeg'),
+    ((0, b'\x89PNG\r\n\x1a\n'), 'png'),
+    ((0, b'GIF87a'), 'gif'),
+    ((0, b'GIF89a'), 'gif'),
+    ((8, b'WEBP'), 'webp'),
+)
+# Кратно 4, чтобы каждый кусок декодировался независимо.
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+def flatten(image):
+    """Переводит изображение в RGB, заливая прозрачность белым."""
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode(image, file_format, quality):
+    buffer = BytesIO()
+    image.save(buffer, file_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def check_size(size):
+    if size > settings.IMAGE_MAX_BYTES:
+        raise serializers.ValidationError(
+            'Размер изображения не должен превышать '
+            f'{settings.IMAGE_MAX_BYTES // 2 ** 20} МБ.'
+        )
+
+
+def detect_extension(head):
+    for (offset, signature), extension in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return extension
+    raise serializers.ValidationError(INVALID_IMAGE_MESSAGE)
+
+
+def decode_base64_image(data):
+    """
+    Декодирует изображение из base64 или data URI по частям.
+
+    Размер проверяется по длине строки до декодирования, формат — по
+    сигнатуре первого куска. Декодированные байты пишутся во временный
+    файл, который остается в памяти только до FILE_UPLOAD_MAX_MEMORY_SIZE.
+    Возвращает (файл, расширение).
+    """
+    if not isinstance(data, str):
+        raise serializers.ValidationError(INVALID_IMAGE_MESSAGE)
+    marker = data.find(';base64,')
+    start = 0 if marker == -1 else marker + len(';base64,')
+    check_size((len(data) - start) * 3 // 4)
+
+    file = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    extension = None
+    size = 0
+    rest = ''
+    try:
+        for position in range(start, len(data), DECODE_CHUNK_SIZE):
+            chunk = rest + ''.join(
+                data[position:position + DECODE_CHUNK_SIZE].split()
+            )
+            end = len(chunk) // 4 * 4
+            decoded = base64.b64decode(chunk[:end], validate=True)
+            rest = chunk[end:]
+            if extension is None:
+                extension = detect_extension(decoded)
+            size += len(decoded)
+            check_size(size)
+            file.write(decoded)
+        if rest or extension is None:
+            raise serializers.ValidationError(INVALID_IMAGE_MESSAGE)
+    except binascii.Error:
+        file.close()
+        raise serializers.ValidationError(INVALID_IMAGE_MESSAGE)
+    except serializers.ValidationError:
+        file.close()
+        raise
+    file.seek(0)
+    return file, extension
+
+
+def validate_image(file):
+    """
+    Проверяет разрешение изображения по заголовку, не декодируя его.
+
+    Отклоняет изображения больше IMAGE_MAX_PIXELS пикселей.
+    """
+    try:
+        image = Image.open(file)
+    except (OSError, SyntaxError, ValueError):
+        raise serializers.ValidationError(INVALID_IMAGE_MESSAGE)
+    finally:
+        file.seek(0)
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise serializers.ValidationError(
+            'Слишком большое разрешение изображения.'
+        )
+
+
+def open_base64_image(data, name):
+    """Декодирует и проверяет изображение, возвращая File для storage."""
+    file, extension = decode_base64_image(data)
+    try:
+        validate_image(file)
+    except serializers.ValidationError:
+        file.close()
+        raise
+    return File(file, name=f'{name}.{extension}')
+
+
+def normalize_image(field_file):
+    """
+    Поворачивает изображение по EXIF, уменьшает до IMAGE_MAX_DIMENSION
+    по большей стороне и пересохраняет в том же формате без метаданных.
+
+    Возвращает имя сохраненного файла.
+    """
+    storage = field_file.storage
+    with field_file.open('rb'):
+        image = Image.open(field_file)
+        file_format = image.format
+        image = ImageOps.exif_transpose(image)
+    if file_format == 'JPEG':
+        image = flatten(image)
+    size = settings.IMAGE_MAX_DIMENSION
+    image.thumbnail((size, size), Image.LANCZOS)
+    content = encode(image, file_format, settings.IMAGE_QUALITY)
+    storage.delete(field_file.name)
+    return storage.save(field_file.name, ContentFile(content))
+
+
+def derivative_name(name, label, extension):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(
+        directory, 'derivatives', f'{stem}_{label}.{extension}'
+    )
+
+
+def fit(image, size):
+    """
+    Обрезает изображение до пропорций size и уменьшает до size.
+
+    Маленькие исходники не растягиваются: копия получает наибольший
+    размер с нужными пропорциями, который помещается в исходник.
+    """
+    width, height = size
+    scale = min(1, image.width / width, image.height / height)
+    box = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return ImageOps.fit(image, box, Image.LANCZOS)
+
+
+def generate_derivatives(field_file, sizes):
+    """Сохраняет уменьшенные копии изображения в WebP и JPEG."""
+    storage = field_file.storage
+    with field_file.open('rb'):
+        image = flatten(Image.open(field_file))
+    for label, size in sizes.items():
+        fitted = fit(image, size)
+        for extension, file_format in FORMATS.items():
+            path = derivative_name(field_file.name, label, extension)
+            if storage.exists(path):
+                storage.delete(path)
+            storage.save(path, ContentFile(
+                encode(fitted, file_format, settings.IMAGE_QUALITY)
+            ))
+
+
+def delete_derivatives(field_file, sizes):
+    storage = field_file.storage
+    for label in sizes:
+        for extension in FORMATS:
+            storage.delete(derivative_name(field_file.name, label, extension))
+
+
+class ImageDerivativesField(serializers.ReadOnlyField):
+    """
+    Ссылки на уменьшенные копии изображения по размерам и форматам.
+
+    Пока копии не созданы фоновой обработкой, возвращает None.
+    """
+
+    def __init__(self, sizes, image_field, status_field, **kwargs):
+        self.sizes = sizes
+        self.image_field = image_field
+        self.status_field = status_field
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        value = getattr(obj, self.image_field)
+        if not value or getattr(obj, self.status_field) != IMAGE_READY:
+            return None
+        request = self.context.get('request')
+        urls = {}
+        for label in self.sizes:
+            urls[label] = {}
+            for extension in FORMATS:
+                url = value.storage.url(
+                    derivative_name(value.name, label, extension)
+                )
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[label][extension] = url
+        return urls
+
+
+class UploadedImageField(Base64ImageField):
+    """
+    Base64ImageField, декодирующий загрузку потоково.
+
+    Вместо полной копии байтов в памяти возвращает временный файл,
+    проверенный по сигнатуре, размеру и разрешению.
+    """
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        return open_base64_image(base64_data, self.get_file_name(None))
@@ -0,0 +1,104 @@
+import hashlib
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from recipes.models import Ingredient
+from .metrics import record_cache
+
+
+def normalize(value):
+    """Приводит строку к виду для сравнения без учета регистра и ё."""
+    return value.casefold().replace('ё', 'е').strip()
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Загружается из базы при первом запросе и сбрасывается сигналами
+    при изменении Ingredient. Изменения, сделанные в других процессах,
+    подхватываются по истечении INGREDIENT_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = None
+        self._items = None
+        self._loaded_at = 0
+        self._signature = None
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = None
+            self._items = None
+
+    def _load(self):
+        ttl = getattr(settings, 'INGREDIENT_INDEX_TTL', 300)
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > ttl
+            record_cache(
+                'ingredient_index', self._keys is not None and not expired
+            )
+            if self._keys is None or expired:
+                items = sorted(
+                    (
+                        (normalize(ingredient.name), ingredient)
+                        for ingredient in Ingredient.objects.all()
+                    ),
+                    key=lambda item: (item[0], item[1].measurement_unit)
+                )
+                self._keys = [key for key, _ in items]
+                self._items = [ingredient for _, ingredient in items]
+                self._loaded_at = time.monotonic()
+                self._signature = hashlib.md5(repr([
+                    (item.id, item.name, item.measurement_unit)
+                    for item in self._items
+                ]).encode()).hexdigest()
+            return self._keys, self._items
+
+    @property
+    def signature(self):
+        """Хеш содержимого индекса, одинаковый для одинаковых данных."""
+        self._load()
+        return self._signature
+
+    def search(self, query='', limit=None):
+        """
+        Возвращает ингредиенты, подходящие под строку поиска.
+
+        Сначала идут точные совпадения, затем совпадения по началу
+        названия и в конце вхождения подстроки.
+        """
+        keys, items = self._load()
+        query = normalize(query)
+        if not query:
+            return items[:limit]
+
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        exact = [
+            items[index] for index in range(start, end)
+            if keys[index] == query
+        ]
+        prefix = [
+            items[index] for index in range(start, end)
+            if keys[index] != query
+        ]
+        result = exact + prefix
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+
+        for index, key in enumerate(keys):
+            if query in key and not start <= index < end:
+                result.append(items[index])
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,121 @@
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.conf import settings
+
+from recipes.models import RecipeIngredient
+from .metrics import record_cache
+
+
+class IngredientMatchIndex:
+    """
+    Разреженная матрица «ингредиент → рецепты» в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов,
+    для каждого рецепта — его ингредиенты. Совпадения считаются только
+    по рецептам, в которых есть хотя бы один ингредиент пользователя,
+    без запросов к базе. Изменения RecipeIngredient применяются
+    сигналами по рецептам; изменения из других процессов подхватываются
+    по истечении INGREDIENT_MATCH_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._recipes = None
+        self._loaded_at = 0
+
+    @staticmethod
+    def _ingredients_by_recipe(recipe_ids=None):
+        links = RecipeIngredient.objects.all()
+        if recipe_ids is not None:
+            links = links.filter(recipe_id__in=recipe_ids)
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in links.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            recipes[recipe_id].append(ingredient_id)
+        return {
+            recipe_id: tuple(sorted(ingredients))
+            for recipe_id, ingredients in recipes.items()
+        }
+
+    def _load(self):
+        ttl = getattr(settings, 'INGREDIENT_MATCH_INDEX_TTL', 300)
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > ttl
+            record_cache(
+                'ingredient_match_index',
+                self._postings is not None and not expired
+            )
+            if self._postings is None or expired:
+                self._recipes = self._ingredients_by_recipe()
+                postings = defaultdict(list)
+                for recipe_id, ingredients in self._recipes.items():
+                    for ingredient_id in ingredients:
+                        postings[ingredient_id].append(recipe_id)
+                self._postings = {
+                    ingredient_id: array('q', sorted(recipe_ids))
+                    for ingredient_id, recipe_ids in postings.items()
+                }
+                self._loaded_at = time.monotonic()
+            return self._postings, self._recipes
+
+    def match(self, ingredient_ids):
+        """
+        Возвращает рецепты, в которых есть ингредиенты из списка.
+
+        Элементы — (id рецепта, доля имеющихся ингредиентов, число
+        имеющихся, всего ингредиентов) по убыванию доли, затем числа
+        совпадений и id рецепта.
+        """
+        postings, recipes = self._load()
+        hits = Counter(chain.from_iterable(
+            postings.get(ingredient_id, ())
+            for ingredient_id in set(ingredient_ids)
+        ))
+        matches = [
+            (recipe_id, count / len(recipes[recipe_id]), count,
+             len(recipes[recipe_id]))
+            for recipe_id, count in hits.items()
+        ]
+        matches.sort(key=lambda item: (item[1], item[2], item[0]),
+                     reverse=True)
+        return matches
+
+    def update(self, recipe_ids):
+        """Перечитывает ингредиенты рецептов и правит матрицу."""
+        if self._postings is None:
+            return
+        recipe_ids = set(recipe_ids)
+        fresh = self._ingredients_by_recipe(recipe_ids)
+        with self._lock:
+            if self._postings is None:
+                return
+            added = defaultdict(set)
+            removed = defaultdict(set)
+            for recipe_id in recipe_ids:
+                old = set(self._recipes.pop(recipe_id, ()))
+                new = set(fresh.get(recipe_id, ()))
+                if new:
+                    self._recipes[recipe_id] = fresh[recipe_id]
+                for ingredient_id in old - new:
+                    removed[ingredient_id].add(recipe_id)
+                for ingredient_id in new - old:
+                    added[ingredient_id].add(recipe_id)
+            for ingredient_id in added.keys() | removed.keys():
+                current = set(self._postings.get(ingredient_id, ()))
+                current -= removed[ingredient_id]
+                current |= added[ingredient_id]
+                if current:
+                    self._postings[ingredient_id] = array(
+                        'q', sorted(current)
+                    )
+                else:
+                    self._postings.pop(ingredient_id, None)
+
+
+ingredient_match_index = IngredientMatchIndex()
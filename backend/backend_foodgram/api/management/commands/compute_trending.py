@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг рецептов в тренде по недавним добавлениям '
+        'в избранное и списки покупок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять пересчет каждые N секунд. '
+                 'По умолчанию — один раз.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            run = compute_trending()
+            self.stdout.write(self.style.SUCCESS(
+                f'Событий: {run.events}, рецептов в рейтинге: '
+                f'{run.recipes}, за {run.duration:.2f} с.'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
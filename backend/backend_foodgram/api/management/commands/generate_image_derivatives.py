@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.image_jobs import enqueue_image_job
+from recipes.models import ImageJob, Recipe
+from user.models import IMAGE_PENDING, FoodgramUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Ставит в очередь обработки изображения рецептов и аватары, '
+        'загруженные до появления копий или через админку. '
+        'Очередь разбирает команда image_worker.'
+    )
+
+    def handle(self, *args, **options):
+        sources = (
+            (Recipe.objects.exclude(image=''), ImageJob.RECIPE,
+             'image_status'),
+            (
+                FoodgramUser.objects.exclude(avatar='').exclude(avatar=None),
+                ImageJob.AVATAR, 'avatar_status'
+            ),
+        )
+        queued = 0
+        with transaction.atomic():
+            for queryset, kind, status_field in sources:
+                for pk in queryset.values_list('pk', flat=True).iterator():
+                    enqueue_image_job(kind, pk)
+                    queued += 1
+                queryset.update(**{status_field: IMAGE_PENDING})
+        self.stdout.write(self.style.SUCCESS(
+            f'Поставлено в очередь изображений: {queued}.'
+        ))
@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from api.image_jobs import claim_job, requeue_stale, retry_failed, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Обрабатывает очередь изображений: нормализует загруженные файлы '
+        'и создает уменьшенные копии в пуле потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза между проверками пустой очереди, в секундах.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать доступные задачи и завершиться.'
+        )
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Вернуть в очередь задачи, исчерпавшие попытки.'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if options['retry_failed']:
+            self.stdout.write(f'Возвращено в очередь: {retry_failed()}.')
+        done = failed = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                if not running:
+                    requeue_stale()
+                while len(running) < workers:
+                    job = claim_job()
+                    if job is None:
+                        break
+                    running.add(pool.submit(run_job, job))
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                finished, running = wait(
+                    running, timeout=options['poll'],
+                    return_when=FIRST_COMPLETED
+                )
+                for future in finished:
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {done}, с ошибками: {failed}.'
+        ))
@@ -0,0 +1,86 @@
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, share):
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест запущенного сервера: N параллельных клиентов '
+        'с keep-alive отправляют GET-запросы и выводят RPS и задержки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--token', help='Токен для заголовка Authorization.'
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Нужен адрес вида http://host:port/path.')
+        path = url.path + (f'?{url.query}' if url.query else '')
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        remaining = iter(range(options['requests']))
+        lock = threading.Lock()
+        latencies = []
+        errors = []
+
+        def client():
+            connection = http.client.HTTPConnection(
+                url.hostname, url.port or 80, timeout=30
+            )
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        break
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException) as error:
+                    connection.close()
+                    status = type(error).__name__
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if status == 200:
+                        latencies.append(elapsed)
+                    else:
+                        errors.append(status)
+            connection.close()
+
+        threads = [
+            threading.Thread(target=client)
+            for _ in range(options['concurrency'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+
+        if not latencies:
+            raise CommandError(f'Нет успешных ответов: {errors[:5]}')
+        latencies.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(latencies) / duration:.1f} запросов/с, '
+            f'p50 {percentile(latencies, 0.5) * 1000:.1f} мс, '
+            f'p95 {percentile(latencies, 0.95) * 1000:.1f} мс, '
+            f'p99 {percentile(latencies, 0.99) * 1000:.1f} мс, '
+            f'ошибок: {len(errors)}.'
+        ))
@@ -0,0 +1,171 @@
+import os
+import resource
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float('inf'),
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float('inf'))
+# Как часто воркер обновляет свои показатели памяти и пула, с.
+WORKER_GAUGES_INTERVAL = 1
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds', 'Время ответа.',
+    ('route', 'method', 'status'),
+)
+REQUEST_SIZE = Histogram(
+    'foodgram_request_size_bytes', 'Размер тела запроса.',
+    ('route',), buckets=SIZE_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes', 'Размер тела ответа.',
+    ('route',), buckets=SIZE_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_db_queries_per_request', 'Запросов к базе на запрос.',
+    ('route',), buckets=QUERY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests', 'Обращения к кешам API.',
+    ('cache', 'result'),
+)
+IN_FLIGHT = Gauge(
+    'foodgram_requests_in_flight', 'Запросы в обработке.',
+    multiprocess_mode='livesum',
+)
+WORKER_RSS = Gauge(
+    'foodgram_worker_rss_bytes', 'Резидентная память воркера.',
+    multiprocess_mode='liveall',
+)
+POOL_CONNECTIONS = Gauge(
+    'foodgram_db_pool_connections', 'Соединения пулов воркеров.',
+    ('database', 'state'), multiprocess_mode='livesum',
+)
+POOL_CHECKOUT = Histogram(
+    'foodgram_db_pool_checkout_seconds',
+    'Время получения соединения из пула.', ('database',),
+)
+POOL_TIMEOUTS = Counter(
+    'foodgram_db_pool_timeouts', 'Таймауты ожидания соединения из пула.',
+    ('database',),
+)
+
+_worker_gauges_at = 0
+# Таймауты пулов, уже переданные в POOL_TIMEOUTS, по (база, pid).
+_pool_timeouts = {}
+
+
+def record_cache(name, hit):
+    """Учитывает попадание или промах кеша name."""
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def update_worker_gauges():
+    """
+    Память и пулы соединений воркера, не чаще раза в секунду.
+
+    Длительности выдачи соединений пул копит сам, здесь они переносятся
+    в гистограмму, поэтому попадают в нее с задержкой до секунды.
+    """
+    global _worker_gauges_at
+    now = time.monotonic()
+    if now - _worker_gauges_at < WORKER_GAUGES_INTERVAL:
+        return
+    _worker_gauges_at = now
+    WORKER_RSS.set(rss_bytes())
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats = pool.stats()
+            POOL_CONNECTIONS.labels(alias, 'idle').set(stats['idle'])
+            POOL_CONNECTIONS.labels(alias, 'in_use').set(stats['in_use'])
+            for wait in pool.drain_checkout_waits():
+                POOL_CHECKOUT.labels(alias).observe(wait)
+            key = (alias, stats['pid'])
+            POOL_TIMEOUTS.labels(alias).inc(
+                stats['timeouts'] - _pool_timeouts.get(key, 0)
+            )
+            _pool_timeouts[key] = stats['timeouts']
+
+
+def get_registry():
+    """
+    Реестр для выдачи метрик.
+
+    Под gunicorn (см. gunicorn.conf.py) каждый воркер пишет значения
+    в файлы PROMETHEUS_MULTIPROC_DIR, и они суммируются при выдаче;
+    иначе используется реестр текущего процесса.
+    """
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    """Возвращает (текст метрик, Content-Type)."""
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    Метрики каждого запроса: время, размеры, число запросов к базе.
+
+    Маршрут берется из имени URL, чтобы число рядов не зависело
+    от путей; запросы мимо URLconf попадают в unmatched.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        # До обработки, пока запрос не занял соединение из пула.
+        update_worker_gauges()
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(count_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        REQUEST_LATENCY.labels(
+            route, request.method, response.status_code
+        ).observe(duration)
+        REQUEST_SIZE.labels(route).observe(
+            int(request.META.get('CONTENT_LENGTH') or 0)
+        )
+        if not response.streaming:
+            RESPONSE_SIZE.labels(route).observe(len(response.content))
+        REQUEST_QUERIES.labels(route).observe(queries)
+        return response
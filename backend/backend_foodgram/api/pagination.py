@@ -1,6 +1,201 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .feed import get_feed_head
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с режимом курсора.
+
+    По умолчанию работает как раньше: ?page=&limit=. Если передан
+    параметр ?cursor= (в том числе пустой), страницы выбираются по
+    ключу сортировки без OFFSET, а общее число объектов считается
+    только по запросу ?count=true. Ключом служит сортировка, заданная
+    queryset через order_by (например, фильтром), иначе cursor_ordering.
+    """
+
+    page_size_query_param = 'limit'
+    page_size = 6
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    cursor_ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.use_cursor(request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_page_size(request)
+        self.ordering = self.get_cursor_ordering(queryset)
+        values, self.reverse = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param, '')
+        )
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.count = queryset.count()
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self.invert(field) for field in ordering)
+        results = self.get_cursor_page(
+            queryset.order_by(*ordering), ordering, values
+        )
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if self.reverse:
+            results.reverse()
+            self.has_next = values is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+        self.page = results
+        return results
+
+    def get_cursor_page(self, queryset, ordering, values):
+        """Первые limit + 1 объектов после ключа values."""
+        if values is not None:
+            try:
+                queryset = queryset.filter(self.after(ordering, values))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return list(queryset[:self.limit + 1])
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.cursor_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.cursor_link(self.page[0], reverse=True)
+
+    def use_cursor(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def get_cursor_ordering(self, queryset):
+        ordering = tuple(queryset.query.order_by)
+        if ordering and all(isinstance(field, str) for field in ordering):
+            return ordering
+        return self.cursor_ordering
+
+    @staticmethod
+    def field_name(field):
+        return field.lstrip('-')
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def after(self, ordering, values):
+        """Условие «строго после» ключа values при сортировке ordering."""
+        condition = Q()
+        for index in reversed(range(len(ordering))):
+            field = ordering[index]
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{self.field_name(field)}__{lookup}': values[index]})
+            if index < len(ordering) - 1:
+                step |= (
+                    Q(**{self.field_name(field): values[index]}) & condition
+                )
+            condition = step
+        return condition
+
+    def cursor_link(self, obj, reverse):
+        position = [
+            getattr(obj, self.field_name(field))
+            for field in self.ordering
+        ]
+        payload = json.dumps({
+            'v': [
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in position
+            ],
+            'r': int(reverse),
+        })
+        cursor = urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(cursor.encode()))
+            values = payload['v']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return values, bool(payload.get('r'))
+        except (BinasciiError, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class SubscriptionsPagination(CustomPagination):
+    cursor_ordering = ('username', 'id')
+
+
+class FeedPagination(CustomPagination):
+    """
+    Курсорная пагинация ленты подписок.
+
+    Ключи без ?cursor= тоже работают курсором. Страницы, которые
+    целиком попадают в закешированное начало ленты (см. api.feed),
+    загружаются по id без поиска по подпискам.
+    """
+
+    def use_cursor(self, request):
+        return True
+
+    def get_cursor_page(self, queryset, ordering, values):
+        if self.reverse:
+            return super().get_cursor_page(queryset, ordering, values)
+        head, complete = get_feed_head(self.request.user)
+        start = 0
+        if values is not None:
+            try:
+                start = head.index(values[-1]) + 1
+            except ValueError:
+                return super().get_cursor_page(queryset, ordering, values)
+        ids = head[start:start + self.limit + 1]
+        if len(ids) <= self.limit and not complete:
+            return super().get_cursor_page(queryset, ordering, values)
+        recipes = queryset.in_bulk(ids)
+        return [recipes[pk] for pk in ids if pk in recipes]
+
+
+class MatchPagination(PageNumberPagination):
+    """Постраничная пагинация списков, посчитанных в памяти."""
+
     page_size_query_param = 'limit'
     page_size = 6
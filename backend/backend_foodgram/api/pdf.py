@@ -0,0 +1,380 @@
+import struct
+import zlib
+from functools import lru_cache
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+FONT_SIZE = 12
+LEADING = 16
+
+CATALOG, PAGES, FONT, CID_FONT, DESCRIPTOR, FONT_FILE, TO_UNICODE = range(
+    1, 8
+)
+FIRST_PAGE_OBJECT = 8
+
+# Таблицы, которые нужны PDF-просмотрщику для шрифта CIDFontType2.
+SUBSET_TABLES = ('cvt ', 'fpgm', 'glyf', 'head', 'hhea', 'hmtx', 'loca',
+                 'maxp', 'prep')
+# Флаги составного глифа в таблице glyf.
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+
+class TrueTypeFont:
+    """Минимальный разбор TrueType-шрифта для встраивания в PDF."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.data = file.read()
+        self.tables = {}
+        num_tables = struct.unpack('>H', self.data[4:6])[0]
+        for index in range(num_tables):
+            entry = 12 + index * 16
+            tag = self.data[entry:entry + 4].decode('latin-1')
+            offset, length = struct.unpack(
+                '>II', self.data[entry + 8:entry + 16]
+            )
+            self.tables[tag] = (offset, length)
+
+        head = self.tables['head'][0]
+        self.units_per_em = self._unpack('>H', head + 18)
+        self.bbox = [
+            self._scale(value) for value in
+            struct.unpack('>hhhh', self.data[head + 36:head + 44])
+        ]
+        hhea = self.tables['hhea'][0]
+        self.ascent = self._scale(self._unpack('>h', hhea + 4))
+        self.descent = self._scale(self._unpack('>h', hhea + 6))
+        self.widths = self._read_widths(self._unpack('>H', hhea + 34))
+        self.glyphs = self._read_cmap()
+        self.locations = self._read_locations()
+
+    def _unpack(self, fmt, offset):
+        return struct.unpack(fmt, self.data[offset:offset + 2])[0]
+
+    def _scale(self, value):
+        return round(value * 1000 / self.units_per_em)
+
+    def _read_widths(self, count):
+        offset = self.tables['hmtx'][0]
+        return [
+            self._scale(self._unpack('>H', offset + index * 4))
+            for index in range(count)
+        ]
+
+    def _read_cmap(self):
+        cmap = self.tables['cmap'][0]
+        subtable = None
+        for index in range(self._unpack('>H', cmap + 2)):
+            entry = cmap + 4 + index * 8
+            platform, encoding, offset = struct.unpack(
+                '>HHI', self.data[entry:entry + 8]
+            )
+            if (platform, encoding) in ((3, 1), (0, 3)):
+                subtable = cmap + offset
+                break
+        if subtable is None or self._unpack('>H', subtable) != 4:
+            raise ValueError('В шрифте нет таблицы cmap формата 4.')
+
+        segments = self._unpack('>H', subtable + 6) // 2
+        ends = subtable + 14
+        starts = ends + segments * 2 + 2
+        deltas = starts + segments * 2
+        range_offsets = deltas + segments * 2
+        glyphs = {}
+        for segment in range(segments):
+            end = self._unpack('>H', ends + segment * 2)
+            start = self._unpack('>H', starts + segment * 2)
+            delta = self._unpack('>h', deltas + segment * 2)
+            range_offset_position = range_offsets + segment * 2
+            range_offset = self._unpack('>H', range_offset_position)
+            for code in range(start, min(end, 0xFFFE) + 1):
+                if range_offset:
+                    glyph = self._unpack(
+                        '>H',
+                        range_offset_position + range_offset
+                        + (code - start) * 2
+                    )
+                    if glyph:
+                        glyph = (glyph + delta) & 0xFFFF
+                else:
+                    glyph = (code + delta) & 0xFFFF
+                if glyph:
+                    glyphs[chr(code)] = glyph
+        return glyphs
+
+    def _read_locations(self):
+        count = self._unpack('>H', self.tables['maxp'][0] + 4) + 1
+        offset = self.tables['loca'][0]
+        if self._unpack('>h', self.tables['head'][0] + 50):
+            return struct.unpack(
+                f'>{count}I', self.data[offset:offset + count * 4]
+            )
+        return [
+            location * 2 for location in struct.unpack(
+                f'>{count}H', self.data[offset:offset + count * 2]
+            )
+        ]
+
+    def width(self, glyph):
+        return self.widths[min(glyph, len(self.widths) - 1)]
+
+    def _glyph(self, glyph):
+        start = self.tables['glyf'][0]
+        return self.data[
+            start + self.locations[glyph]:start + self.locations[glyph + 1]
+        ]
+
+    def _components(self, data):
+        """Номера глифов, из которых собран составной глиф."""
+        if len(data) < 10 or struct.unpack('>h', data[:2])[0] >= 0:
+            return
+        offset = 10
+        flags = MORE_COMPONENTS
+        while flags & MORE_COMPONENTS:
+            flags, glyph = struct.unpack('>HH', data[offset:offset + 4])
+            yield glyph
+            offset += 8 if flags & ARG_1_AND_2_ARE_WORDS else 6
+            if flags & WE_HAVE_A_SCALE:
+                offset += 2
+            elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+                offset += 4
+            elif flags & WE_HAVE_A_TWO_BY_TWO:
+                offset += 8
+
+    def subset(self, glyphs):
+        """
+        Шрифт только с контурами глифов glyphs.
+
+        Номера глифов сохраняются, поэтому остальные глифы остаются
+        пустыми, а CIDToGIDMap может быть Identity.
+        """
+        keep = {0}
+        pending = list(glyphs)
+        while pending:
+            glyph = pending.pop()
+            if glyph in keep or glyph >= len(self.locations) - 1:
+                continue
+            keep.add(glyph)
+            pending.extend(self._components(self._glyph(glyph)))
+
+        glyf, locations, size = [], [0], 0
+        for glyph in range(len(self.locations) - 1):
+            if glyph in keep:
+                data = self._glyph(glyph)
+                data += b'\0' * (-len(data) % 4)
+                glyf.append(data)
+                size += len(data)
+            locations.append(size)
+
+        tables = {
+            tag: self.data[offset:offset + length]
+            for tag, (offset, length) in self.tables.items()
+            if tag in SUBSET_TABLES
+        }
+        tables['glyf'] = b''.join(glyf)
+        tables['loca'] = struct.pack(f'>{len(locations)}I', *locations)
+        # Длинный формат loca, контрольная сумма файла не используется.
+        head = tables['head']
+        tables['head'] = (
+            head[:8] + b'\0' * 4 + head[12:50] + struct.pack('>h', 1)
+            + head[52:]
+        )
+        return pack_tables(tables)
+
+
+def pack_tables(tables):
+    count = len(tables)
+    power = 1 << (count.bit_length() - 1)
+    header = struct.pack(
+        '>IHHHH', 0x00010000, count, power * 16,
+        power.bit_length() - 1, (count - power) * 16
+    )
+    directory, body = [], []
+    offset = len(header) + count * 16
+    for tag in sorted(tables):
+        data = tables[tag]
+        padded = data + b'\0' * (-len(data) % 4)
+        checksum = sum(
+            struct.unpack(f'>{len(padded) // 4}I', padded)
+        ) & 0xFFFFFFFF
+        directory.append(struct.pack(
+            '>4sIII', tag.encode('latin-1'), checksum, offset, len(data)
+        ))
+        body.append(padded)
+        offset += len(padded)
+    return header + b''.join(directory) + b''.join(body)
+
+
+@lru_cache(maxsize=None)
+def load_font(path):
+    return TrueTypeFont(path)
+
+
+class PdfWriter:
+    """
+    Потоковая запись текстового PDF-документа.
+
+    Страницы отдаются по мере заполнения, а шрифт, дерево страниц
+    и таблица xref дописываются в конце файла.
+    """
+
+    def __init__(self, font_path):
+        self.font = load_font(font_path)
+        self.offsets = {}
+        self.position = 0
+        self.pages = []
+        self.used = {}
+        self.lines = []
+        self.lines_per_page = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+        self.max_width = (PAGE_WIDTH - 2 * MARGIN) * 1000 // FONT_SIZE
+
+    def _emit(self, data):
+        self.position += len(data)
+        return data
+
+    def _object(self, number, body, stream=None):
+        self.offsets[number] = self.position
+        chunk = f'{number} 0 obj\n'.encode() + body
+        if stream is not None:
+            chunk += b'\nstream\n' + stream + b'\nendstream'
+        return self._emit(chunk + b'\nendobj\n')
+
+    def _encode(self, text):
+        glyphs = []
+        for char in text:
+            glyph = self.font.glyphs.get(char, 0)
+            self.used[glyph] = char
+            glyphs.append(glyph)
+        return glyphs
+
+    def _wrap(self, text):
+        line, width = [], 0
+        for glyph in self._encode(text):
+            glyph_width = self.font.width(glyph)
+            if line and width + glyph_width > self.max_width:
+                yield line
+                line, width = [], 0
+            line.append(glyph)
+            width += glyph_width
+        yield line
+
+    def start(self):
+        yield self._emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        yield self._object(
+            CATALOG, f'<< /Type /Catalog /Pages {PAGES} 0 R >>'.encode()
+        )
+
+    def write(self, text):
+        """Добавляет строку и возвращает заполненные страницы."""
+        for line in self._wrap(text):
+            self.lines.append(line)
+            if len(self.lines) == self.lines_per_page:
+                yield from self._flush_page()
+
+    def _flush_page(self):
+        number = FIRST_PAGE_OBJECT + len(self.pages) * 2
+        self.pages.append(number)
+        text = ' T*\n'.join(
+            '<' + ''.join(f'{glyph:04x}' for glyph in line) + '> Tj'
+            for line in self.lines
+        )
+        content = zlib.compress(
+            f'BT /F1 {FONT_SIZE} Tf {LEADING} TL '
+            f'{MARGIN} {PAGE_HEIGHT - MARGIN - FONT_SIZE} Td\n'
+            f'{text}\nET'.encode()
+        )
+        self.lines = []
+        yield self._object(number, (
+            f'<< /Type /Page /Parent {PAGES} 0 R '
+            f'/MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 {FONT} 0 R >> >> '
+            f'/Contents {number + 1} 0 R >>'
+        ).encode())
+        yield self._object(
+            number + 1,
+            f'<< /Length {len(content)} /Filter /FlateDecode >>'.encode(),
+            content
+        )
+
+    def _to_unicode(self):
+        entries = [
+            f'<{glyph:04x}> <{ord(char):04x}>'
+            for glyph, char in sorted(self.used.items()) if glyph
+        ]
+        blocks = []
+        for index in range(0, len(entries), 100):
+            block = entries[index:index + 100]
+            blocks.append(
+                f'{len(block)} beginbfchar\n' + '\n'.join(block)
+                + '\nendbfchar'
+            )
+        return (
+            '/CIDInit /ProcSet findresource begin\n12 dict begin\n'
+            'begincmap\n/CIDSystemInfo << /Registry (Adobe) '
+            '/Ordering (UCS) /Supplement 0 >> def\n'
+            '/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n'
+            '1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n'
+            + '\n'.join(blocks)
+            + '\nendcmap\nCMapName currentdict /CMap defineresource pop\n'
+            'end\nend'
+        ).encode()
+
+    def finish(self):
+        """Дописывает последнюю страницу, шрифт и таблицу xref."""
+        if self.lines or not self.pages:
+            yield from self._flush_page()
+        font = self.font
+        kids = ' '.join(f'{number} 0 R' for number in self.pages)
+        yield self._object(PAGES, (
+            f'<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>'
+        ).encode())
+        yield self._object(FONT, (
+            f'<< /Type /Font /Subtype /Type0 /BaseFont /ShoppingListFont '
+            f'/Encoding /Identity-H /DescendantFonts [{CID_FONT} 0 R] '
+            f'/ToUnicode {TO_UNICODE} 0 R >>'
+        ).encode())
+        widths = ' '.join(
+            f'{glyph} [{font.width(glyph)}]' for glyph in sorted(self.used)
+        )
+        yield self._object(CID_FONT, (
+            f'<< /Type /Font /Subtype /CIDFontType2 '
+            f'/BaseFont /ShoppingListFont /CIDSystemInfo << '
+            f'/Registry (Adobe) /Ordering (Identity) /Supplement 0 >> '
+            f'/FontDescriptor {DESCRIPTOR} 0 R /CIDToGIDMap /Identity '
+            f'/W [{widths}] >>'
+        ).encode())
+        bbox = ' '.join(str(value) for value in font.bbox)
+        yield self._object(DESCRIPTOR, (
+            f'<< /Type /FontDescriptor /FontName /ShoppingListFont '
+            f'/Flags 32 /FontBBox [{bbox}] /ItalicAngle 0 '
+            f'/Ascent {font.ascent} /Descent {font.descent} '
+            f'/CapHeight {font.ascent} /StemV 80 '
+            f'/FontFile2 {FONT_FILE} 0 R >>'
+        ).encode())
+        font_file = font.subset(self.used)
+        compressed = zlib.compress(font_file)
+        yield self._object(FONT_FILE, (
+            f'<< /Length {len(compressed)} /Length1 {len(font_file)} '
+            f'/Filter /FlateDecode >>'
+        ).encode(), compressed)
+        to_unicode = self._to_unicode()
+        yield self._object(
+            TO_UNICODE, f'<< /Length {len(to_unicode)} >>'.encode(),
+            to_unicode
+        )
+
+        size = FIRST_PAGE_OBJECT + len(self.pages) * 2
+        xref_position = self.position
+        xref = [f'xref\n0 {size}\n0000000000 65535 f \n']
+        for number in range(1, size):
+            xref.append(f'{self.offsets[number]:010d} 00000 n \n')
+        yield self._emit((
+            ''.join(xref)
+            + f'trailer\n<< /Size {size} /Root {CATALOG} 0 R >>\n'
+            f'startxref\n{xref_position}\n%%EOF\n'
+        ).encode())
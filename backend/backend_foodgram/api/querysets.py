@@ -0,0 +1,108 @@
+from collections import defaultdict
+
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from recipes.models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                            Tag)
+from user.models import FoodgramUser, Subscription
+
+
+def _false():
+    return Value(False, output_field=BooleanField())
+
+
+def annotate_users(queryset, viewer):
+    """Добавляет пользователям признак подписки на них текущего юзера."""
+    if viewer is None or viewer.is_anonymous:
+        return queryset.annotate(subscribed=_false())
+    return queryset.annotate(subscribed=Exists(
+        Subscription.objects.filter(user=viewer, author=OuterRef('pk'))
+    ))
+
+
+def annotate_recipes(queryset, viewer):
+    """Добавляет рецептам признаки избранного и списка покупок."""
+    if viewer is None or viewer.is_anonymous:
+        return queryset.annotate(
+            is_favorited=_false(),
+            is_in_shopping_cart=_false(),
+        )
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=viewer, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=viewer, recipe=OuterRef('pk'))
+        ),
+    )
+
+
+def get_recipe_queryset(viewer):
+    """
+    Queryset рецептов для чтения.
+
+    Страница любого размера загружается фиксированным числом запросов:
+    сами рецепты с признаками текущего пользователя, авторы, теги
+    и ингредиенты вместе с количеством.
+    """
+    authors = annotate_users(FoodgramUser.objects.only(
+        'id', 'email', 'username', 'first_name', 'last_name', 'avatar',
+        'avatar_status'
+    ), viewer)
+    recipe_ingredients = RecipeIngredient.objects.select_related(
+        'ingredient'
+    ).only(
+        'id', 'amount', 'recipe_id',
+        'ingredient__id', 'ingredient__name',
+        'ingredient__measurement_unit',
+    )
+    queryset = Recipe.objects.prefetch_related(
+        Prefetch('author', queryset=authors),
+        Prefetch('tags', queryset=Tag.objects.only('id', 'name', 'slug')),
+        Prefetch('recipeingredient_set', queryset=recipe_ingredients),
+    )
+    return annotate_recipes(queryset, viewer)
+
+
+def get_subscriptions_queryset(user):
+    """Авторы, на которых подписан пользователь, с числом рецептов."""
+    return annotate_users(
+        FoodgramUser.objects.filter(author__user=user), user
+    ).order_by('username', 'id')
+
+
+def attach_recent_recipes(authors, limit=None):
+    """
+    Загружает последние рецепты авторов одним запросом.
+
+    При заданном limit для каждого автора выбираются limit самых новых
+    рецептов через ROW_NUMBER() OVER (PARTITION BY author_id). Рецепты
+    сохраняются в атрибут recent_recipes.
+    """
+    authors = list(authors)
+    recipes = Recipe.objects.filter(
+        author_id__in=[author.id for author in authors]
+    ).only(
+        'id', 'name', 'image', 'image_status', 'cooking_time', 'author_id',
+        'pub_date'
+    )
+    if limit is not None:
+        ranked = recipes.order_by().annotate(row_number=Window(
+            RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )).values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        recipes = recipes.filter(id__in=RawSQL(
+            f'SELECT "id" FROM ({sql}) AS ranked WHERE "row_number" <= %s',
+            (*params, limit)
+        ))
+    by_author = defaultdict(list)
+    for recipe in recipes:
+        by_author[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recent_recipes = by_author[author.id]
+    return authors
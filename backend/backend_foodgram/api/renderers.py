@@ -0,0 +1,48 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Рендерер формата списка покупок.
+
+    Сам файл формируется во view потоково, через рендерер
+    проходят только ответы с ошибками.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+SHOPPING_LIST_RENDERERS = [
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListPDFRenderer,
+]
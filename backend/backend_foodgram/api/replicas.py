@@ -0,0 +1,156 @@
+import itertools
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_read_alias = ContextVar('read_alias', default=None)
+_down_until = {}
+_lock = threading.Lock()
+_round_robin = None
+
+
+def pin_key(user_id):
+    return f'replicas:pin:{user_id}'
+
+
+def is_pinned(request):
+    """Писал ли клиент недавно: тогда читаем с основной базы."""
+    if request.COOKIES.get(settings.REPLICA_PIN_COOKIE):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(
+        user is not None and user.is_authenticated
+        and cache.get(pin_key(user.id))
+    )
+
+
+def pin_to_primary(request, response):
+    """Закрепляет клиента за основной базой на REPLICA_PIN_SECONDS."""
+    seconds = settings.REPLICA_PIN_SECONDS
+    response.set_cookie(
+        settings.REPLICA_PIN_COOKIE, '1', max_age=seconds,
+        httponly=True, samesite='Lax'
+    )
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(pin_key(user.id), True, seconds)
+
+
+def read_primary_if_fresh(*versions):
+    """
+    Переключает чтение запроса на основную базу для свежих версий.
+
+    Версии кеша — время изменения. Пока с него не прошло
+    REPLICA_PIN_SECONDS, реплика могла еще не получить изменение,
+    и заполненный с нее кеш сохранил бы старые данные под новой версией.
+    """
+    if _read_alias.get() is not None and versions and (
+        time.time() - max(versions) < settings.REPLICA_PIN_SECONDS
+    ):
+        _read_alias.set(None)
+
+
+def candidates():
+    """Реплики в порядке опроса согласно REPLICA_STRATEGY."""
+    global _round_robin
+    replicas = list(settings.REPLICA_WEIGHTS)
+    if not replicas:
+        return []
+    if settings.REPLICA_STRATEGY == 'round_robin':
+        with _lock:
+            if _round_robin is None:
+                _round_robin = itertools.cycle(range(len(replicas)))
+            start = next(_round_robin)
+        return replicas[start:] + replicas[:start]
+    weights = [settings.REPLICA_WEIGHTS[alias] for alias in replicas]
+    first = random.choices(replicas, weights)[0]
+    return [first] + [alias for alias in replicas if alias != first]
+
+
+def choose_replica():
+    """
+    Первая доступная реплика или None, если читать нужно с основной.
+
+    Реплика, к которой не удалось подключиться, пропускается
+    REPLICA_RETRY_SECONDS секунд.
+    """
+    now = time.monotonic()
+    for alias in candidates():
+        if _down_until.get(alias, 0) > now:
+            continue
+        try:
+            connections[alias].ensure_connection()
+        except OperationalError:
+            _down_until[alias] = now + settings.REPLICA_RETRY_SECONDS
+            continue
+        return alias
+    return None
+
+
+class ReplicaRouter:
+    """
+    Отправляет чтения на реплику, выбранную для текущего запроса.
+
+    Вне ReplicaReadMixin, внутри транзакций и для записи используется
+    основная база.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None if db == DEFAULT_DB_ALIAS else False
+
+
+class ReplicaReadMixin:
+    """
+    Читает безопасные запросы представления с реплики.
+
+    Пользователь определяется по основной базе, чтобы только что
+    выданный токен был виден сразу. Клиенты, закрепленные после
+    записи (см. ReplicaPinMiddleware), читают с основной базы.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _read_alias.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request):
+            _read_alias.set(choose_replica())
+
+
+class ReplicaPinMiddleware:
+    """После успешного изменяющего запроса закрепляет клиента."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            settings.REPLICA_WEIGHTS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            pin_to_primary(request, response)
+        return response
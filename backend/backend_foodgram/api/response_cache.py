@@ -0,0 +1,211 @@
+import hashlib
+import random
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from .metrics import record_cache
+from .replicas import read_primary_if_fresh
+
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.05
+
+
+def cache_is_shared():
+    """
+    Общий ли кеш у всех процессов.
+
+    LocMemCache у каждого воркера свой: сброс версии в одном процессе
+    не виден остальным, и они продолжают отдавать устаревшее. С ним
+    кеш ответов, ETag, снимки списков покупок и начало ленты
+    выключены.
+    """
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [checks.Warning(
+        'Кеш по умолчанию — LocMemCache, кеширование ответов API '
+        'выключено.',
+        hint='Укажите общий кеш в CACHE_LOCATION (memcached).',
+        id='api.W001',
+    )]
+
+
+def version_key(group):
+    return f'api_cache:{group}:version'
+
+
+def bump_cache_version(*groups):
+    """Помечает устаревшими закешированные ответы групп."""
+    now = time.time()
+    cache.set_many(
+        {version_key(group): now for group in groups}, timeout=None
+    )
+
+
+def get_cache_version(group):
+    key = version_key(group)
+    version = cache.get(key)
+    if version is None:
+        version = time.time()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def viewer_version_key(user_id):
+    return f'api_cache:viewer:{user_id}'
+
+
+def bump_viewer_version(*user_ids):
+    """Помечает измененными избранное, корзину и подписки пользователей."""
+    now = time.time()
+    cache.set_many(
+        {viewer_version_key(user_id): now for user_id in user_ids},
+        timeout=None
+    )
+
+
+def get_viewer_version(user):
+    """Версия данных пользователя, влияющих на ответы API."""
+    if user is None or user.is_anonymous:
+        return 0
+    key = viewer_version_key(user.id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def normalize_query(query_params):
+    """Приводит параметры запроса к порядку, не зависящему от клиента."""
+    return urlencode(sorted(
+        (key, value)
+        for key, values in query_params.lists()
+        for value in values
+    ))
+
+
+class ResponseCacheMixin:
+    """
+    Кеширование готовых ответов list и retrieve.
+
+    Кешируются только JSON-ответы. Ключ строится из версии группы
+    cache_group, пути и нормализованной строки запроса. Версия
+    меняется сигналами при изменении данных (см. api.signals).
+
+    Пока один процесс формирует ответ, остальные отдают последний
+    закешированный ответ на тот же запрос прошлой версии (X-Cache:
+    STALE). Если его нет, они коротко ждут и формируют ответ сами,
+    не записывая его в кеш. Ответ для только что измененной версии
+    записывается в кеш по данным основной базы, а не реплики.
+    """
+
+    cache_group = None
+    cache_authenticated = False
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_request_digest(self, request):
+        # Путь и параметры хешируются: ключи memcached ограничены
+        # 250 байтами ASCII без пробелов.
+        return hashlib.md5('?'.join((
+            request.path, normalize_query(request.query_params)
+        )).encode()).hexdigest()
+
+    def get_response_cache_versions(self, request):
+        """Версии кеша, от которых зависит ответ."""
+        return (get_cache_version(self.cache_group),)
+
+    def get_response_cache_key(self, request, versions):
+        return ':'.join((
+            'api_cache',
+            self.cache_group,
+            *(repr(version) for version in versions),
+            self.get_request_digest(request),
+        ))
+
+    def get_latest_key(self, request):
+        """Ключ ссылки на последний закешированный ответ запроса."""
+        return ':'.join((
+            'api_cache', self.cache_group, 'latest',
+            self.get_request_digest(request),
+        ))
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        self.response_cache_key = None
+        if (
+            not settings.API_CACHE_TIMEOUT
+            or not cache_is_shared()
+            or request.accepted_renderer.format != 'json'
+            or request.user.is_authenticated and not self.cache_authenticated
+        ):
+            return handler(request, *args, **kwargs)
+
+        versions = self.get_response_cache_versions(request)
+        key = self.get_response_cache_key(request, versions)
+        latest_key = self.get_latest_key(request)
+        found = cache.get_many([key, latest_key])
+        cached = found.get(key)
+        locked = cached is None and cache.add(f'{key}:lock', 1, LOCK_TIMEOUT)
+        stale = False
+        if cached is None and not locked:
+            latest = found.get(latest_key)
+            if latest is not None:
+                cached = cache.get(latest)
+                stale = cached is not None
+            if cached is None:
+                time.sleep(LOCK_WAIT)
+                cached = cache.get(key)
+        record_cache('response', cached is not None)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'STALE' if stale else 'HIT'
+            return response
+
+        if locked:
+            self.response_cache_key = key
+            self.response_cache_latest_key = latest_key
+            read_primary_if_fresh(*versions)
+        return handler(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        key = getattr(self, 'response_cache_key', None)
+        if key is None:
+            return response
+        self.response_cache_key = None
+        try:
+            if response.status_code == 200:
+                response.render()
+                timeout = settings.API_CACHE_TIMEOUT
+                cache.set_many(
+                    {
+                        key: (response.content, response['Content-Type']),
+                        self.response_cache_latest_key: key,
+                    },
+                    random.randint(timeout * 9 // 10, timeout)
+                )
+                response['X-Cache'] = 'MISS'
+        finally:
+            cache.delete(f'{key}:lock')
+        return response
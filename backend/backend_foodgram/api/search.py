@@ -0,0 +1,201 @@
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import (Case, F, FloatField, OuterRef, Subquery, Value,
+                              When)
+from django.db.models.functions import Cast, Coalesce
+
+from recipes.models import Recipe, RecipeIngredient, RecipeTag
+from .ingredient_index import normalize
+from .metrics import record_cache
+
+CONFIG = 'russian'
+# Веса полей как у ts_rank по умолчанию для A, B, C и D.
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+TOKEN_RE = re.compile(r'[^\W_]+')
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ого', 'его', 'ому',
+    'ему', 'ыми', 'ими', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий',
+    'ой', 'ей', 'ую', 'юю', 'ою', 'ею', 'ым', 'им', 'ом', 'ем', 'ам', 'ям',
+    'ах', 'ях', 'ых', 'их', 'ов', 'ев', 'ия', 'ья', 'ию', 'ью', 'ии', 'ье',
+    'ся', 'сь', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+MIN_STEM = 3
+
+
+def stem(word):
+    """Упрощенный стеммер: отрезает самое длинное окончание."""
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    return [stem(word) for word in TOKEN_RE.findall(normalize(text or ''))]
+
+
+def aggregated_names(model, field):
+    """Подзапрос: имена связанных объектов рецепта через пробел."""
+    return Coalesce(Subquery(
+        model.objects.filter(recipe=OuterRef('pk')).values('recipe').annotate(
+            names=StringAgg(field, ' ')
+        ).values('names')
+    ), Value(''))
+
+
+class PostgresRecipeSearch:
+    """
+    Полнотекстовый поиск по Recipe.search_vector.
+
+    Вектор собирается из названия (вес A), тегов (B), ингредиентов (C)
+    и описания (D) с русской морфологией и индексируется GIN.
+    """
+
+    def search(self, queryset, query):
+        query = SearchQuery(query, config=CONFIG, search_type='websearch')
+        # ts_rank возвращает real, а его текстовое представление неточно:
+        # ключ курсора по такому значению не совпал бы с ним в базе.
+        return queryset.filter(search_vector=query).annotate(rank=Cast(
+            SearchRank(F('search_vector'), query), FloatField()
+        )).order_by('-rank', '-pub_date', '-id')
+
+    def update(self, recipe_ids):
+        Recipe.objects.filter(pk__in=recipe_ids).update(search_vector=(
+            SearchVector('name', config=CONFIG, weight='A')
+            + SearchVector(
+                aggregated_names(RecipeTag, 'tag__name'),
+                config=CONFIG, weight='B'
+            )
+            + SearchVector(
+                aggregated_names(RecipeIngredient, 'ingredient__name'),
+                config=CONFIG, weight='C'
+            )
+            + SearchVector('text', config=CONFIG, weight='D')
+        ))
+
+
+class InMemoryRecipeSearch:
+    """
+    Инвертированный индекс рецептов в памяти процесса.
+
+    Замена полнотекстового поиска для SQLite в разработке и тестах:
+    те же поля и веса, упрощенный стеммер, все слова запроса должны
+    встретиться в рецепте. Изменения из других процессов подхватываются
+    по истечении RECIPE_SEARCH_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._documents = None
+        self._loaded_at = 0
+
+    def _documents_for(self, recipe_ids=None):
+        recipes = Recipe.objects.all()
+        tags = RecipeTag.objects.all()
+        ingredients = RecipeIngredient.objects.all()
+        if recipe_ids is not None:
+            recipes = recipes.filter(pk__in=recipe_ids)
+            tags = tags.filter(recipe_id__in=recipe_ids)
+            ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+        documents = {}
+        for recipe_id, name, text in recipes.values_list('id', 'name', 'text'):
+            documents[recipe_id] = defaultdict(float)
+            self._add(documents[recipe_id], name, 'A')
+            self._add(documents[recipe_id], text, 'D')
+        for related, field, weight in (
+            (tags, 'tag__name', 'B'),
+            (ingredients, 'ingredient__name', 'C'),
+        ):
+            for recipe_id, name in related.values_list('recipe_id', field):
+                if recipe_id in documents:
+                    self._add(documents[recipe_id], name, weight)
+        return documents
+
+    @staticmethod
+    def _add(document, text, weight):
+        for token in tokenize(text):
+            document[token] = max(document[token], WEIGHTS[weight])
+
+    def _index(self, recipe_id, document):
+        self._documents[recipe_id] = document
+        for token, weight in document.items():
+            self._postings[token][recipe_id] = weight
+
+    def _remove(self, recipe_id):
+        for token in self._documents.pop(recipe_id, ()):
+            self._postings[token].pop(recipe_id, None)
+
+    def _load(self):
+        ttl = getattr(settings, 'RECIPE_SEARCH_INDEX_TTL', 300)
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > ttl
+            record_cache(
+                'search_index', self._postings is not None and not expired
+            )
+            if self._postings is None or expired:
+                self._postings = defaultdict(dict)
+                self._documents = {}
+                for recipe_id, document in self._documents_for().items():
+                    self._index(recipe_id, document)
+                self._loaded_at = time.monotonic()
+            return self._postings
+
+    def scores(self, query):
+        """Возвращает {id рецепта: вес} для рецептов со всеми словами."""
+        postings = self._load()
+        scores = None
+        for token in set(tokenize(query)):
+            matches = postings.get(token, {})
+            if scores is None:
+                scores = dict(matches)
+            else:
+                scores = {
+                    recipe_id: score + matches[recipe_id]
+                    for recipe_id, score in scores.items()
+                    if recipe_id in matches
+                }
+        return scores or {}
+
+    def search(self, queryset, query):
+        scores = self.scores(query)
+        return queryset.filter(pk__in=scores).annotate(rank=Case(
+            *(
+                When(pk=recipe_id, then=Value(score))
+                for recipe_id, score in scores.items()
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )).order_by('-rank', '-pub_date', '-id')
+
+    def update(self, recipe_ids):
+        if self._postings is None:
+            return
+        recipe_ids = set(recipe_ids)
+        documents = self._documents_for(recipe_ids)
+        with self._lock:
+            if self._postings is None:
+                return
+            for recipe_id in recipe_ids:
+                self._remove(recipe_id)
+                if recipe_id in documents:
+                    self._index(recipe_id, documents[recipe_id])
+
+
+postgres_search = PostgresRecipeSearch()
+memory_search = InMemoryRecipeSearch()
+
+
+def get_recipe_search():
+    """Поисковый бэкенд для текущей СУБД."""
+    if connection.vendor == 'postgresql':
+        return postgres_search
+    return memory_search
@@ -1,17 +1,19 @@
-import base64
-
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from rest_framework.exceptions import ValidationError
-from django.core.files.base import ContentFile
 from django.db import transaction
 from djoser.serializers import UserSerializer as DjoserUserSerializer
-from drf_extra_fields.fields import Base64ImageField
 
-from user.models import FoodgramUser, Subscription
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from user.models import IMAGE_PENDING, FoodgramUser, Subscription
+from recipes.models import (Favorite, ImageJob, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
 from .constants import MAX_AMOUNT, MIN_AMOUNT
+from .image_jobs import enqueue_image_job
+from .images import (AVATAR_DERIVATIVES, RECIPE_DERIVATIVES,
+                     ImageDerivativesField, UploadedImageField,
+                     delete_derivatives, open_base64_image)
+from .timing import TimedSerializerMixin
+from .viewer import ViewerFlagsMixin
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -29,21 +31,22 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserSerializer(DjoserUserSerializer):
+class UserSerializer(ViewerFlagsMixin, DjoserUserSerializer):
     is_subscribed = serializers.SerializerMethodField()
+    avatar_derivatives = ImageDerivativesField(
+        AVATAR_DERIVATIVES, 'avatar', 'avatar_status'
+    )
 
     class Meta(DjoserUserSerializer.Meta):
         model = FoodgramUser
         fields = (
-            'email', 'id', 'avatar', 'is_subscribed',
-            'username', 'first_name', 'last_name'
+            'email', 'id', 'avatar', 'avatar_status', 'avatar_derivatives',
+            'is_subscribed', 'username', 'first_name', 'last_name'
         )
+        read_only_fields = ('avatar_status',)
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return obj.follower.filter(id=request.user.id).exists()
+        return self.get_viewer_flag(obj, 'subscribed', 'subscribed_ids')
 
 
 class UserAvatarSerializer(serializers.Serializer):
@@ -56,27 +59,35 @@ class UserAvatarSerializer(serializers.Serializer):
 
     def create_avatar(self, user):
         try:
-            format, imgstr = self.validated_data['avatar'].split(';base64,')
-            ext = format.split('/')[1]
-            image = ContentFile(
-                base64.b64decode(imgstr), name=f'user_avatar.{ext}')
+            image = open_base64_image(
+                self.validated_data['avatar'], 'user_avatar'
+            )
 
             if user.avatar:
+                delete_derivatives(user.avatar, AVATAR_DERIVATIVES)
                 user.avatar.delete(save=False)
-            user.avatar.save(f'user_avatar.{ext}', image, save=True)
-            user.save()
+            with image, transaction.atomic():
+                user.avatar_status = IMAGE_PENDING
+                user.avatar.save(image.name, image, save=True)
+                enqueue_image_job(ImageJob.AVATAR, user.id)
+        except serializers.ValidationError:
+            raise
         except Exception as e:
             raise serializers.ValidationError(str(e))
 
 
 class ShowFavoriteSerializer(serializers.ModelSerializer):
+    image_derivatives = ImageDerivativesField(
+        RECIPE_DERIVATIVES, 'image', 'image_status'
+    )
 
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'image_derivatives', 'cooking_time']
 
 
-class ShowSubscriptionsSerializer(serializers.ModelSerializer):
+class ShowSubscriptionsSerializer(TimedSerializerMixin, ViewerFlagsMixin,
+                                  serializers.ModelSerializer):
 
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
@@ -96,24 +107,23 @@ class ShowSubscriptionsSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return obj.followers.filter(id=request.user.id).exists()
+        return self.get_viewer_flag(obj, 'subscribed', 'subscribed_ids')
 
     def get_recipes(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        recipes = Recipe.objects.filter(author=obj)
-        limit = request.query_params.get('recipes_limit')
-        if limit:
-            recipes = recipes[:int(limit)]
+        recipes = getattr(obj, 'recent_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.filter(author=obj)
+            limit = request.query_params.get('recipes_limit')
+            if limit and limit.isdigit():
+                recipes = recipes[:int(limit)]
         return ShowFavoriteSerializer(
             recipes, many=True, context={'request': request}).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -199,14 +209,19 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeShortSerializer(serializers.ModelSerializer):
+class RecipeShortSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
+    image_derivatives = ImageDerivativesField(
+        RECIPE_DERIVATIVES, 'image', 'image_status'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_derivatives', 'cooking_time')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, ViewerFlagsMixin,
+                       serializers.ModelSerializer):
 
     ingredients = IngredientWithAmountSerializer(
         many=True,
@@ -215,30 +230,38 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, required=True)
-    image = Base64ImageField(required=False)
+    image = UploadedImageField(required=False)
+    image_derivatives = ImageDerivativesField(
+        RECIPE_DERIVATIVES, 'image', 'image_status'
+    )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'text', 'ingredients', 'tags', 'cooking_time',
-                  'author', 'image', 'is_favorited', 'is_in_shopping_cart')
-        read_only_fields = ('author',)
+                  'author', 'image', 'image_status', 'image_derivatives',
+                  'is_favorited', 'is_in_shopping_cart')
+        read_only_fields = ('author', 'image_status')
 
     def get_is_favorited(self, obj):
         """Метод для проверки наличия рецепта в избранном."""
-        user = self.context['request'].user
-        return (
-            user.is_authenticated
-            and user.favorites.filter(recipe=obj).exists()
-        )
+        return self.get_viewer_flag(obj, 'is_favorited', 'favorite_ids')
 
     def get_is_in_shopping_cart(self, obj):
         """Метод для проверки наличия рецепта в списке покупок."""
-        user = self.context['request'].user
-        return (
-            user.is_authenticated
-            and user.shopping_cart.filter(recipe=obj).exists()
+        return self.get_viewer_flag(
+            obj, 'is_in_shopping_cart', 'shopping_cart_ids'
+        )
+
+
+class RecipeMatchSerializer(RecipeSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    matched_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            'coverage', 'matched_ingredients'
         )
 
 
@@ -250,7 +273,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         required=True
     )
     ingredients = RecipeIngredientCreateSerializer(many=True)
-    image = Base64ImageField()
+    image = UploadedImageField()
     cooking_time = serializers.IntegerField(
         min_value=MIN_AMOUNT,
         max_value=MAX_AMOUNT
@@ -280,10 +303,13 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
 
-        recipe = Recipe.objects.create(**validated_data)
+        recipe = Recipe.objects.create(
+            **validated_data, image_status=IMAGE_PENDING
+        )
         recipe.tags.set(tags)
 
         self.recipe_ingredients(recipe, ingredients)
+        enqueue_image_job(ImageJob.RECIPE, recipe.id)
         return recipe
 
     @transaction.atomic
@@ -299,6 +325,11 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             instance.recipeingredient_set.all().delete()
             self.recipe_ingredients(instance, ingredients)
 
+        if 'image' in validated_data:
+            instance.image = validated_data['image']
+            instance.image_status = IMAGE_PENDING
+            enqueue_image_job(ImageJob.RECIPE, instance.id)
+
         instance.save()
         return instance
 
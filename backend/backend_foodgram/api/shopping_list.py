@@ -0,0 +1,145 @@
+import csv
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum
+
+from recipes.models import RecipeIngredient
+from .metrics import record_cache
+from .pdf import PdfWriter
+from .replicas import read_primary_if_fresh
+from .response_cache import cache_is_shared
+
+TITLE = 'Список покупок'
+CATALOG_VERSION_KEY = 'shopping_list:version'
+
+
+def get_shopping_list(user):
+    """Суммирует ингредиенты рецептов из списка покупок на стороне БД."""
+    return (
+        RecipeIngredient.objects
+        .filter(recipe__shopping_cart__user=user)
+        .values('ingredient_id')
+        .annotate(
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+            total_amount=Sum('amount'),
+        )
+        .order_by('name', 'ingredient_id')
+    )
+
+
+def user_version_key(user_id):
+    return f'shopping_list:version:{user_id}'
+
+
+def bump_shopping_list_version(*user_ids):
+    """Помечает списки покупок пользователей как измененные."""
+    if user_ids:
+        now = time.time()
+        cache.set_many(
+            {user_version_key(user_id): now for user_id in user_ids},
+            timeout=None
+        )
+
+
+def bump_catalog_version():
+    """Помечает измененными списки покупок всех пользователей."""
+    cache.set(CATALOG_VERSION_KEY, time.time(), timeout=None)
+
+
+def get_shopping_list_version(user_id):
+    """
+    Возвращает версию списка покупок пользователя.
+
+    Версия — время последнего изменения списка в секундах. Если версии
+    нет в кеше, она заводится заново и прежние снимки не используются.
+    """
+    key = user_version_key(user_id)
+    versions = cache.get_many([CATALOG_VERSION_KEY, key])
+    if key not in versions:
+        versions[key] = time.time()
+        cache.set(key, versions[key], timeout=None)
+    return max(versions.values())
+
+
+def get_cached_shopping_list(user, version):
+    """Возвращает снимок списка покупок для версии, кешируя его."""
+    if not cache_is_shared():
+        return list(get_shopping_list(user))
+    key = f'shopping_list:{user.id}:{version!r}'
+    items = cache.get(key)
+    record_cache('shopping_list', items is not None)
+    if items is None:
+        read_primary_if_fresh(version)
+        items = list(get_shopping_list(user))
+        cache.set(key, items, settings.SHOPPING_LIST_CACHE_TIMEOUT)
+    return items
+
+
+def format_line(item):
+    return (
+        f"- {item['name']} ({item['measurement_unit']}) — "
+        f"{item['total_amount']}"
+    )
+
+
+class Echo:
+    """Объект с интерфейсом файла для потоковой записи csv."""
+
+    def write(self, value):
+        return value
+
+
+def export_txt(items):
+    yield f'{TITLE}:\n\n'
+    for item in items:
+        yield format_line(item) + '\n'
+
+
+def export_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(['name', 'measurement_unit', 'amount'])
+    for item in items:
+        yield writer.writerow(
+            [item['name'], item['measurement_unit'], item['total_amount']]
+        )
+
+
+def export_json(items):
+    yield '['
+    separator = ''
+    for item in items:
+        yield separator + json.dumps({
+            'id': item['ingredient_id'],
+            'name': item['name'],
+            'measurement_unit': item['measurement_unit'],
+            'amount': item['total_amount'],
+        }, ensure_ascii=False)
+        separator = ', '
+    yield ']'
+
+
+def export_pdf(items):
+    pdf = PdfWriter(settings.SHOPPING_LIST_PDF_FONT)
+    yield from pdf.start()
+    yield from pdf.write(f'{TITLE}:')
+    yield from pdf.write('')
+    for item in items:
+        yield from pdf.write(format_line(item))
+    yield from pdf.finish()
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'json': export_json,
+    'pdf': export_pdf,
+}
+
+
+def export_shopping_list(user, file_format, version):
+    """Возвращает генератор файла списка покупок в нужном формате."""
+    return EXPORTERS[file_format](get_cached_shopping_list(user, version))
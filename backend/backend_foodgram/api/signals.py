@@ -0,0 +1,273 @@
+import threading
+
+from django.contrib.auth import user_logged_out
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, ShoppingCart, Tag)
+from user.models import FoodgramUser, Subscription
+from .feed import bump_feed_version
+from .ingredient_index import ingredient_index
+from .ingredient_match import ingredient_match_index
+from .response_cache import bump_cache_version, bump_viewer_version
+from .search import get_recipe_search
+from .shopping_list import (bump_catalog_version,
+                            bump_shopping_list_version)
+from .tokens import revoke_session
+from .trending import RANKING_GROUP
+
+# Поля автора, которые RecipeSerializer отдает в author.
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name', 'avatar',
+                 'avatar_status')
+
+
+# Накопленные значения on_commit_batch по базам; соединения Django
+# у каждого потока свои.
+_batches = threading.local()
+
+
+def on_commit_batch(name, func, *values):
+    """
+    Копит values до фиксации транзакции и вызывает func(values) один раз.
+
+    Пересохранение рецепта шлет сигналы по каждой строке ингредиентов,
+    а обработчику достаточно одного вызова на транзакцию. В Django 3.2
+    нет хука отката, поэтому уже поставленный вызов узнается по очереди
+    connection.run_on_commit: Django заменяет ее при фиксации и откате.
+    Во вложенном atomic (connection.savepoint_ids) копится отдельный
+    вызов, чтобы откат точки сохранения отбросил и его значения. На оба
+    атрибута опирается OnCommitBatchTransactionTest.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        func(set(values))
+        return
+    batches = _batches.__dict__.setdefault(connection.alias, {})
+    queue, savepoints, pending = batches.get(name, (None, None, None))
+    if (
+        queue is not connection.run_on_commit
+        or savepoints != connection.savepoint_ids
+    ):
+        pending = set()
+        batches[name] = (
+            connection.run_on_commit, list(connection.savepoint_ids), pending
+        )
+        transaction.on_commit(lambda: func(pending))
+    pending.update(values)
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    """Сбрасывает индекс ингредиентов при их изменении."""
+    ingredient_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_shopping_lists(**kwargs):
+    """Сбрасывает все списки покупок при изменении ингредиента."""
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def invalidate_user_shopping_list(instance, **kwargs):
+    """Сбрасывает список покупок пользователя при изменении корзины."""
+    on_commit_batch(
+        'shopping_lists',
+        lambda user_ids: bump_shopping_list_version(*user_ids),
+        instance.user_id
+    )
+
+
+def bump_recipe_shopping_lists(recipe_ids):
+    bump_shopping_list_version(*ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('user_id', flat=True).distinct())
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def invalidate_recipe_shopping_lists(instance, **kwargs):
+    """Сбрасывает списки покупок, в которые входит измененный рецепт."""
+    on_commit_batch(
+        'recipe_shopping_lists', bump_recipe_shopping_lists,
+        instance.recipe_id
+    )
+
+
+def invalidate_responses(*groups):
+    on_commit_batch(
+        'responses', lambda groups: bump_cache_version(*groups), *groups
+    )
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+@receiver([post_save, post_delete], sender=RecipeTag)
+def invalidate_recipe_responses(**kwargs):
+    """Сбрасывает кеш ответов с рецептами."""
+    invalidate_responses('recipes')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags_responses(action, **kwargs):
+    """Сбрасывает кеш ответов с рецептами при изменении их тегов."""
+    if action.startswith('post_'):
+        invalidate_responses('recipes')
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag_responses(**kwargs):
+    """Сбрасывает кеш тегов и рецептов."""
+    invalidate_responses('tags', 'recipes')
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_responses(**kwargs):
+    """Сбрасывает кеш ингредиентов и рецептов."""
+    invalidate_responses('ingredients', 'recipes')
+
+
+@receiver(pre_save, sender=FoodgramUser)
+def remember_author_fields(instance, update_fields=None, **kwargs):
+    """Запоминает поля автора из ответов с рецептами до сохранения."""
+    if instance.pk is None or not instance.recipes_count:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+        AUTHOR_FIELDS
+    ):
+        return
+    instance._saved_author_fields = FoodgramUser.objects.filter(
+        pk=instance.pk
+    ).values_list(*AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=FoodgramUser)
+def invalidate_author_responses(instance, **kwargs):
+    """
+    Сбрасывает кеш рецептов, только если у автора изменились поля,
+    которые показываются в рецептах. Регистрации, смена пароля и вход
+    кеш не трогают.
+    """
+    saved = instance.__dict__.pop('_saved_author_fields', None)
+    if saved is not None and saved != tuple(
+        getattr(instance, field) for field in AUTHOR_FIELDS
+    ):
+        invalidate_responses('recipes')
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def invalidate_ranking_responses(**kwargs):
+    """Счетчики меняют порядок ?ordering=popular."""
+    invalidate_responses(RANKING_GROUP)
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+@receiver([post_save, post_delete], sender=ShoppingCart)
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_viewer_responses(instance, **kwargs):
+    """Меняет ETag ответов для пользователя при изменении его отметок."""
+    on_commit_batch(
+        'viewers', lambda user_ids: bump_viewer_version(*user_ids),
+        instance.user_id
+    )
+
+
+def update_search(*recipe_ids):
+    on_commit_batch(
+        'search', lambda recipe_ids: get_recipe_search().update(recipe_ids),
+        *recipe_ids
+    )
+
+
+def update_search_query(get_recipe_ids):
+    transaction.on_commit(
+        lambda: get_recipe_search().update(list(get_recipe_ids()))
+    )
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def update_recipe_search(instance, **kwargs):
+    """Обновляет поисковый индекс рецепта после фиксации транзакции."""
+    update_search(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+@receiver([post_save, post_delete], sender=RecipeTag)
+def update_recipe_search_links(instance, **kwargs):
+    """Обновляет поиск при изменении тегов и ингредиентов рецепта."""
+    update_search(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_recipe_search_tags(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        update_search(instance.pk)
+    elif pk_set:
+        update_search(*pk_set)
+    else:
+        update_search_query(lambda: Recipe.objects.filter(
+            tags=instance
+        ).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+def update_tag_search(instance, created, **kwargs):
+    """Переиндексирует рецепты с переименованным тегом."""
+    if not created:
+        update_search_query(lambda: RecipeTag.objects.filter(
+            tag_id=instance.pk
+        ).values_list('recipe_id', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search(instance, created, **kwargs):
+    """Переиндексирует рецепты с переименованным ингредиентом."""
+    if not created:
+        update_search_query(lambda: RecipeIngredient.objects.filter(
+            ingredient_id=instance.pk
+        ).values_list('recipe_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def update_ingredient_match(instance, **kwargs):
+    """Обновляет матрицу ингредиентов рецепта после фиксации."""
+    recipe_id = instance.pk if isinstance(instance, Recipe) else (
+        instance.recipe_id
+    )
+    on_commit_batch(
+        'ingredient_match', ingredient_match_index.update, recipe_id
+    )
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_followers_feed(instance, created=True, **kwargs):
+    """Сбрасывает начало ленты подписчиков при публикации и удалении."""
+    if not created:
+        return
+    author_id = instance.author_id
+    transaction.on_commit(lambda: bump_feed_version(
+        *Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+    ))
+
+
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_subscriber_feed(instance, **kwargs):
+    """Сбрасывает начало ленты при подписке и отписке."""
+    on_commit_batch(
+        'feeds', lambda user_ids: bump_feed_version(*user_ids),
+        instance.user_id
+    )
+
+
+@receiver(user_logged_out)
+def revoke_signed_session(request, **kwargs):
+    """Выход по подписанному токену отзывает его сессию."""
+    revoke_session(getattr(request, 'auth', None))
@@ -0,0 +1,21 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'Планы проверяются на PostgreSQL.'
+)
+class FilterPlansTest(TestCase):
+    """Фильтры рецептов не читают индексированные таблицы целиком."""
+
+    def test_filters_use_indexes(self):
+        output = StringIO()
+        try:
+            call_command('explain_filters', stdout=output)
+        except CommandError as error:
+            self.fail(f'{error}\n{output.getvalue()}')
@@ -0,0 +1,108 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.feed import get_feed_version
+from recipes.models import Recipe
+from user.models import FoodgramUser, Subscription
+
+URL = '/api/recipes/feed/'
+
+
+class FeedHeadTest(TestCase):
+    """Закешированное начало ленты меняется вместе с лентой."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.TemporaryDirectory()
+        cls.cache_settings = override_settings(
+            CACHES={'default': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cls.cache_dir.name,
+            }},
+            REPLICA_WEIGHTS={},
+        )
+        cls.cache_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.cache_settings.disable()
+        cls.cache_dir.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author, cls.other = (
+            FoodgramUser.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='pass12345!'
+            )
+            for name in ('user', 'author', 'other')
+        )
+        Subscription.objects.create(user=cls.user, author=cls.author)
+        for author, name in (
+            (cls.author, 'Первый'), (cls.author, 'Второй'),
+            (cls.other, 'Чужой'),
+        ):
+            cls.create_recipe(author, name)
+
+    @staticmethod
+    def create_recipe(author, name):
+        return Recipe.objects.create(
+            author=author, name=name, text='Текст', cooking_time=10,
+            image='recipes/images/test.png'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get_feed(), ['Второй', 'Первый'])
+        self.version = get_feed_version(self.user.id)
+
+    def get_feed(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def assert_feed_changed(self, names):
+        self.assertNotEqual(get_feed_version(self.user.id), self.version)
+        self.assertEqual(self.get_feed(), names)
+
+    def test_head_is_cached(self):
+        # Рецепт без сигналов не сбрасывает кеш и в ленте не появляется.
+        Recipe.objects.bulk_create([Recipe(
+            author=self.author, name='Без сигнала', text='Текст',
+            cooking_time=10, image='recipes/images/test.png'
+        )])
+        self.assertEqual(self.get_feed(), ['Второй', 'Первый'])
+        self.assertEqual(get_feed_version(self.user.id), self.version)
+
+    def test_author_publishes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_recipe(self.author, 'Новый')
+        self.assert_feed_changed(['Новый', 'Второй', 'Первый'])
+
+    def test_author_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(name='Второй').delete()
+        self.assert_feed_changed(['Первый'])
+
+    def test_follow(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(user=self.user, author=self.other)
+        self.assert_feed_changed(['Чужой', 'Второй', 'Первый'])
+
+    def test_unfollow(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.filter(user=self.user).delete()
+        self.assert_feed_changed([])
+
+    def test_other_author_does_not_change_feed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_recipe(self.other, 'Еще чужой')
+        self.assertEqual(get_feed_version(self.user.id), self.version)
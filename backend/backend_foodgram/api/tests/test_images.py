@@ -0,0 +1,18 @@
+from django.test import SimpleTestCase
+from PIL import Image
+
+from api.images import fit
+
+
+class FitTest(SimpleTestCase):
+    """Копии обрезаются по пропорциям и не растягиваются."""
+
+    def test_large_source_is_reduced(self):
+        image = Image.new('RGB', (3000, 1000))
+        self.assertEqual(fit(image, (480, 320)).size, (480, 320))
+
+    def test_small_source_is_not_upscaled(self):
+        image = Image.new('RGB', (300, 100))
+        self.assertEqual(fit(image, (480, 320)).size, (150, 100))
+        image = Image.new('RGB', (64, 640))
+        self.assertEqual(fit(image, (128, 128)).size, (64, 64))
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+ROWS = (
+    'Соль,г\n'
+    'Сахар,г\n'
+    # Вторая пачка: повтор из первой, строка с ошибкой, уже в базе.
+    'Соль,г\n'
+    'Мука\n'
+    'Перец,г\n'
+)
+
+
+class ImportIngredientsTest(TestCase):
+    """Счетчики импорта не зависят от --dry-run и деления на пачки."""
+
+    def setUp(self):
+        Ingredient.objects.create(name='Перец', measurement_unit='г')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'ingredients.csv')
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(ROWS)
+
+    def run_import(self, *args):
+        output = StringIO()
+        call_command(
+            'import_ingredients', '--path', self.path, '--batch-size', '2',
+            *args, stdout=output
+        )
+        return output.getvalue()
+
+    def test_dry_run(self):
+        self.assertIn(
+            'строк 5, добавлено 2, пропущено 2, с ошибками 1',
+            self.run_import('--dry-run')
+        )
+        self.assertEqual(Ingredient.objects.count(), 1)
+
+    def test_import(self):
+        self.assertIn(
+            'строк 5, добавлено 2, пропущено 2, с ошибками 1',
+            self.run_import()
+        )
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', flat=True)),
+            {'Соль', 'Сахар', 'Перец'}
+        )
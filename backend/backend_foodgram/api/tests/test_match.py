@@ -0,0 +1,91 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.ingredient_match import ingredient_match_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from user.models import FoodgramUser
+
+# Ингредиенты рецептов по номерам; у пользователя есть 0 и 1.
+RECIPES = {
+    'full_two': (0, 1),
+    'full_one': (0,),
+    'half_two': (0, 1, 2, 3),
+    'half_one_first': (0, 2),
+    'half_one_second': (1, 3),
+    'none': (2, 3),
+}
+
+
+@override_settings(REPLICA_WEIGHTS={})
+class IngredientMatchTest(TestCase):
+    """Порядок рецептов по доле имеющихся ингредиентов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = FoodgramUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='pass12345!'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {i}', measurement_unit='г'
+            )
+            for i in range(4)
+        ]
+        cls.recipes = {}
+        for name, numbers in RECIPES.items():
+            recipe = Recipe.objects.create(
+                author=author, name=name, text='Текст', cooking_time=10,
+                image='recipes/images/test.png'
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=cls.ingredients[number],
+                    amount=1
+                )
+                for number in numbers
+            )
+            cls.recipes[name] = recipe.id
+
+    def setUp(self):
+        ingredient_match_index._postings = None
+        self.addCleanup(setattr, ingredient_match_index, '_postings', None)
+        self.have = [self.ingredients[0].id, self.ingredients[1].id]
+
+    def test_ranking_order_and_ties(self):
+        # Доля, затем число совпадений; при равенстве — новые рецепты.
+        self.assertEqual(ingredient_match_index.match(self.have), [
+            (self.recipes['full_two'], 1.0, 2, 2),
+            (self.recipes['full_one'], 1.0, 1, 1),
+            (self.recipes['half_two'], 0.5, 2, 4),
+            (self.recipes['half_one_second'], 0.5, 1, 2),
+            (self.recipes['half_one_first'], 0.5, 1, 2),
+        ])
+
+    def test_update_changes_ranking(self):
+        ingredient_match_index.match(self.have)
+        recipe_id = self.recipes['none']
+        RecipeIngredient.objects.create(
+            recipe_id=recipe_id, ingredient=self.ingredients[0], amount=1
+        )
+        ingredient_match_index.update([recipe_id])
+        matches = ingredient_match_index.match(self.have)
+        self.assertIn((recipe_id, 1 / 3, 1, 3), matches)
+        self.assertEqual(matches[-1][0], recipe_id)
+
+    def test_endpoint(self):
+        response = APIClient().get('/api/recipes/match/', {
+            'ingredients': ','.join(str(i) for i in self.have),
+            'limit': 3,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(
+            [
+                (recipe['name'], recipe['coverage'],
+                 recipe['matched_ingredients'])
+                for recipe in response.data['results']
+            ],
+            [('full_two', 1.0, 2), ('full_one', 1.0, 1),
+             ('half_two', 0.5, 2)]
+        )
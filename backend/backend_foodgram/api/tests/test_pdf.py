@@ -0,0 +1,34 @@
+import os
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from api.pdf import PdfWriter, load_font
+
+
+@skipUnless(
+    os.path.exists(settings.SHOPPING_LIST_PDF_FONT), 'Шрифт для PDF не найден.'
+)
+class PdfFontSubsetTest(SimpleTestCase):
+    """В PDF встраиваются только использованные глифы шрифта."""
+
+    def render(self, lines):
+        pdf = PdfWriter(settings.SHOPPING_LIST_PDF_FONT)
+        chunks = list(pdf.start())
+        for line in lines:
+            chunks.extend(pdf.write(line))
+        chunks.extend(pdf.finish())
+        return b''.join(chunks)
+
+    def test_font_is_subset(self):
+        font = load_font(settings.SHOPPING_LIST_PDF_FONT)
+        document = self.render(['Мука пшеничная (г) — 500'] * 100)
+        self.assertLess(len(document), len(font.data) // 4)
+
+    def test_subset_keeps_glyph_numbers(self):
+        font = load_font(settings.SHOPPING_LIST_PDF_FONT)
+        glyph = font.glyphs['Ж']
+        subset = font.subset({glyph})
+        self.assertIn(font._glyph(glyph), subset)
+        self.assertLess(len(subset), len(font.data) // 4)
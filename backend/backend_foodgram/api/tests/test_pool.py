@@ -0,0 +1,207 @@
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+import psycopg2
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from prometheus_client import REGISTRY
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_INTRANS,
+                                 TRANSACTION_STATUS_UNKNOWN)
+
+from api import metrics
+from backend_foodgram.postgresql.pool import (ConnectionPool, PoolTimeout,
+                                              get_pool)
+
+
+class FakeCursor:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql):
+        if self.connection.broken:
+            raise psycopg2.OperationalError('server closed the connection')
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.status = TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """Выдача и возврат соединений пула."""
+
+    def setUp(self):
+        self.pool = ConnectionPool(max_size=2, timeout=0.05)
+        self.created = []
+
+    def connect(self):
+        connection = FakeConnection()
+        self.created.append(connection)
+        return connection
+
+    def test_returned_connection_is_reused(self):
+        first = self.pool.getconn(self.connect)
+        self.pool.putconn(first)
+        self.assertIs(self.pool.getconn(self.connect), first)
+        self.assertEqual(len(self.created), 1)
+
+    def test_idle_connections_are_reused_last_in_first_out(self):
+        first = self.pool.getconn(self.connect)
+        second = self.pool.getconn(self.connect)
+        self.pool.putconn(first)
+        self.pool.putconn(second)
+        self.assertIs(self.pool.getconn(self.connect), second)
+
+    def test_exhausted_pool_times_out(self):
+        self.pool.getconn(self.connect)
+        self.pool.getconn(self.connect)
+        with self.assertRaises(PoolTimeout):
+            self.pool.getconn(self.connect)
+        stats = self.pool.stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['in_use'], 2)
+
+    def test_checkout_waits_are_drained(self):
+        self.pool.getconn(self.connect)
+        self.pool.getconn(self.connect)
+        with self.assertRaises(PoolTimeout):
+            self.pool.getconn(self.connect)
+        waits = self.pool.drain_checkout_waits()
+        self.assertEqual(len(waits), 3)
+        self.assertGreaterEqual(waits[-1], self.pool.timeout)
+        self.assertEqual(self.pool.drain_checkout_waits(), [])
+
+    def test_metrics(self):
+        def sample(name):
+            return REGISTRY.get_sample_value(
+                name, {'database': 'pool_metrics'}
+            ) or 0
+
+        before = (
+            sample('foodgram_db_pool_checkout_seconds_count'),
+            sample('foodgram_db_pool_timeouts_total'),
+        )
+        self.pool.getconn(self.connect)
+        self.pool.getconn(self.connect)
+        with self.assertRaises(PoolTimeout):
+            self.pool.getconn(self.connect)
+        connections = {'pool_metrics': SimpleNamespace(pool=self.pool)}
+        with mock.patch.object(metrics, 'connections', connections):
+            for _ in range(2):
+                metrics._worker_gauges_at = 0
+                metrics.update_worker_gauges()
+        self.assertEqual(
+            sample('foodgram_db_pool_checkout_seconds_count'), before[0] + 3
+        )
+        self.assertEqual(
+            sample('foodgram_db_pool_timeouts_total'), before[1] + 1
+        )
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        connection = self.pool.getconn(self.connect)
+        connection.status = TRANSACTION_STATUS_INTRANS
+        self.pool.putconn(connection)
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertEqual(self.pool.stats()['idle'], 1)
+
+    def test_broken_connections_are_discarded(self):
+        closed = self.pool.getconn(self.connect)
+        closed.closed = 1
+        self.pool.putconn(closed)
+        unknown = self.pool.getconn(self.connect)
+        unknown.status = TRANSACTION_STATUS_UNKNOWN
+        self.pool.putconn(unknown)
+        stats = self.pool.stats()
+        self.assertEqual(stats['discarded'], 2)
+        self.assertEqual(stats['size'], 0)
+
+    def test_failed_health_check_opens_new_connection(self):
+        stale = self.pool.getconn(self.connect)
+        self.pool.putconn(stale)
+        stale.broken = True
+        fresh = self.pool.getconn(self.connect)
+        self.assertIsNot(fresh, stale)
+        self.assertTrue(stale.closed)
+        self.assertEqual(self.pool.stats()['size'], 1)
+
+    def test_failed_connect_frees_slot(self):
+        def fail():
+            raise psycopg2.OperationalError('connection refused')
+
+        with self.assertRaises(psycopg2.OperationalError):
+            self.pool.getconn(fail)
+        self.assertEqual(self.pool.stats()['size'], 0)
+
+    def test_get_pool(self):
+        self.assertIsNone(get_pool('pool_test', {'POOL_SIZE': 0}))
+        pool = get_pool('pool_test', {'POOL_SIZE': 3, 'POOL_TIMEOUT': 1})
+        self.assertIs(get_pool('pool_test', {'POOL_SIZE': 3}), pool)
+        self.assertEqual((pool.max_size, pool.timeout), (3, 1))
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'Нужен PostgreSQL.'
+)
+class PostgresConnectionPoolTest(TestCase):
+    """Пул с настоящими соединениями к тестовой базе."""
+
+    def setUp(self):
+        self.pool = ConnectionPool(max_size=1, timeout=0.05)
+        self.addCleanup(self.pool.close)
+        params = connection.get_connection_params()
+        self.connect = lambda: psycopg2.connect(**params)
+
+    def test_checkout_and_return(self):
+        first = self.pool.getconn(self.connect)
+        with first.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertNotEqual(
+            first.get_transaction_status(), TRANSACTION_STATUS_IDLE
+        )
+        with self.assertRaises(PoolTimeout):
+            self.pool.getconn(self.connect)
+
+        self.pool.putconn(first)
+        self.assertEqual(
+            first.get_transaction_status(), TRANSACTION_STATUS_IDLE
+        )
+        self.assertIs(self.pool.getconn(self.connect), first)
+        self.pool.putconn(first)
+
+    def test_terminated_connection_is_replaced(self):
+        first = self.pool.getconn(self.connect)
+        with first.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            pid = cursor.fetchone()[0]
+        first.rollback()
+        self.pool.putconn(first)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        second = self.pool.getconn(self.connect)
+        self.assertIsNot(second, first)
+        self.pool.putconn(second)
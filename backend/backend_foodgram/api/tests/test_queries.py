@@ -0,0 +1,117 @@
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from user.models import FoodgramUser, Subscription
+
+# Число рецептов, страница с отметками пользователя, авторы, теги
+# и ингредиенты; с токеном — еще поиск токена. ETag строится из версий
+# в кеше и запросов к базе не добавляет.
+ANONYMOUS_QUERIES = 5
+AUTHENTICATED_QUERIES = 6
+# Для рецепта — те же запросы без подсчета числа рецептов.
+ANONYMOUS_DETAIL_QUERIES = 4
+AUTHENTICATED_DETAIL_QUERIES = 5
+
+
+# Общий кеш, как в проде, чтобы работали ETag; готовые ответы
+# не кешируются, иначе запросы не дойдут до базы. Запросы считаются
+# по основной базе, даже если заданы реплики.
+@override_settings(
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+    }},
+    API_CACHE_TIMEOUT=0,
+    REPLICA_WEIGHTS={},
+)
+class RecipeQueriesTest(TestCase):
+    """
+    Число запросов к рецептам не зависит от размера страницы,
+    числа тегов и ингредиентов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [
+            FoodgramUser.objects.create_user(
+                email=f'author{i}@example.com', username=f'author{i}',
+                first_name='Имя', last_name='Фамилия', password='pass12345!'
+            )
+            for i in range(3)
+        ]
+        tags = [
+            Tag.objects.create(name=f'Тег {i}', slug=f'tag{i}')
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {i}', measurement_unit='г'
+            )
+            for i in range(5)
+        ]
+        cls.user = FoodgramUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Имя', last_name='Фамилия', password='pass12345!'
+        )
+        for i in range(25):
+            recipe = Recipe.objects.create(
+                author=authors[i % 3], name=f'Рецепт {i}', text='Текст',
+                cooking_time=10, image='recipes/images/test.png'
+            )
+            recipe.tags.set(tags[:1 + i % 3])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=j + 1
+                )
+                for j, ingredient in enumerate(ingredients[:2 + i % 3])
+            )
+            if i % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscription.objects.create(user=cls.user, author=authors[0])
+        cls.token = Token.objects.create(user=cls.user)
+
+    def assert_list_queries(self, client, queries):
+        for limit in (1, 5, 10, 25):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(queries):
+                    response = client.get(
+                        '/api/recipes/', {'limit': limit}
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def assert_detail_queries(self, client, queries):
+        # Рецепты с разным числом тегов, ингредиентов и отметок.
+        for recipe in Recipe.objects.order_by('id')[:4]:
+            with self.subTest(recipe=recipe.name):
+                with self.assertNumQueries(queries):
+                    response = client.get(f'/api/recipes/{recipe.id}/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    len(response.data['ingredients']),
+                    RecipeIngredient.objects.filter(recipe=recipe).count()
+                )
+
+    def get_authenticated_client(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return client
+
+    def test_anonymous(self):
+        self.assert_list_queries(APIClient(), ANONYMOUS_QUERIES)
+
+    def test_authenticated(self):
+        self.assert_list_queries(
+            self.get_authenticated_client(), AUTHENTICATED_QUERIES
+        )
+
+    def test_detail_anonymous(self):
+        self.assert_detail_queries(APIClient(), ANONYMOUS_DETAIL_QUERIES)
+
+    def test_detail_authenticated(self):
+        self.assert_detail_queries(
+            self.get_authenticated_client(), AUTHENTICATED_DETAIL_QUERIES
+        )
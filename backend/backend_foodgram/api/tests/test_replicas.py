@@ -0,0 +1,178 @@
+import time
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import OperationalError, connections, transaction
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import replicas
+from recipes.models import Recipe
+from user.models import FoodgramUser
+
+REPLICA = 'replica_0'
+
+
+class ReplicaRouterTest(TransactionTestCase):
+    """Чтения уходят на выбранную реплику, кроме транзакций."""
+
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+        token = replicas._read_alias.set(REPLICA)
+        self.addCleanup(replicas._read_alias.reset, token)
+
+    def test_read_uses_chosen_replica(self):
+        self.assertEqual(self.router.db_for_read(Recipe), REPLICA)
+
+    def test_read_inside_transaction_uses_primary(self):
+        with transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(Recipe))
+        self.assertEqual(self.router.db_for_read(Recipe), REPLICA)
+
+    def test_writes_and_migrations_use_primary(self):
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        self.assertIsNone(self.router.allow_migrate('default', 'recipes'))
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'recipes'))
+
+
+@override_settings(REPLICA_PIN_SECONDS=5)
+class ReadPrimaryIfFreshTest(SimpleTestCase):
+    """Кеш свежей версии заполняется с основной базы."""
+
+    def setUp(self):
+        token = replicas._read_alias.set(REPLICA)
+        self.addCleanup(replicas._read_alias.reset, token)
+
+    def test_fresh_version_reads_primary(self):
+        replicas.read_primary_if_fresh(time.time() - 10, time.time() - 1)
+        self.assertIsNone(replicas._read_alias.get())
+
+    def test_old_version_keeps_replica(self):
+        replicas.read_primary_if_fresh(time.time() - 10)
+        self.assertEqual(replicas._read_alias.get(), REPLICA)
+
+
+@override_settings(
+    REPLICA_WEIGHTS={'replica_0': 1, 'replica_1': 1},
+    REPLICA_STRATEGY='round_robin',
+    REPLICA_RETRY_SECONDS=30,
+)
+class ChooseReplicaTest(SimpleTestCase):
+    """Недоступная реплика пропускается, без реплик читаем с основной."""
+
+    def setUp(self):
+        replicas._down_until.clear()
+        replicas._round_robin = None
+        self.addCleanup(replicas._down_until.clear)
+        self.connections = {
+            alias: mock.Mock() for alias in ('replica_0', 'replica_1')
+        }
+        patcher = mock.patch.object(
+            replicas, 'connections', self.connections
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fail_connections(self, *aliases):
+        for alias in aliases:
+            self.connections[alias].ensure_connection.side_effect = (
+                OperationalError('connection refused')
+            )
+
+    def test_down_replica_is_skipped(self):
+        self.fail_connections('replica_0')
+        self.assertEqual(replicas.choose_replica(), 'replica_1')
+        self.assertEqual(replicas.choose_replica(), 'replica_1')
+        # До истечения REPLICA_RETRY_SECONDS реплику не опрашиваем.
+        self.assertEqual(
+            self.connections['replica_0'].ensure_connection.call_count, 1
+        )
+
+    def test_all_down_falls_back_to_primary(self):
+        self.fail_connections('replica_0', 'replica_1')
+        self.assertIsNone(replicas.choose_replica())
+
+    @override_settings(REPLICA_WEIGHTS={'replica_0': 1})
+    def test_replica_is_retried_after_timeout(self):
+        self.fail_connections('replica_0')
+        with mock.patch.object(replicas.time, 'monotonic', return_value=0):
+            self.assertIsNone(replicas.choose_replica())
+        self.connections['replica_0'].ensure_connection.side_effect = None
+        with mock.patch.object(replicas.time, 'monotonic', return_value=31):
+            self.assertEqual(replicas.choose_replica(), 'replica_0')
+
+
+@override_settings(REPLICA_WEIGHTS={'replica_0': 1})
+class ReplicaPinTest(TestCase):
+    """После изменяющего запроса клиент читает с основной базы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = FoodgramUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Имя', last_name='Фамилия', password='pass12345!'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='Текст', cooking_time=10,
+            image='recipes/images/test.png'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_unsafe_request_pins_client(self):
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.id}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('db_primary', response.cookies)
+        self.assertTrue(cache.get(replicas.pin_key(self.user.id)))
+
+        with mock.patch.object(replicas, 'choose_replica') as choose:
+            self.client.get('/api/recipes/')
+            # Без cookie клиент закреплен по пользователю в кеше.
+            self.client.cookies.clear()
+            self.client.get('/api/recipes/')
+        choose.assert_not_called()
+
+    def test_failed_request_does_not_pin(self):
+        response = self.client.post('/api/recipes/0/favorite/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('db_primary', response.cookies)
+
+    def test_safe_request_reads_from_replica(self):
+        with mock.patch.object(
+            replicas, 'choose_replica', return_value=None
+        ) as choose:
+            self.client.get('/api/recipes/')
+        choose.assert_called_once_with()
+
+
+@skipUnless(
+    REPLICA in connections.databases, 'Реплики не заданы (DATABASE_REPLICAS).'
+)
+class ReplicaReadTest(TransactionTestCase):
+    """Список рецептов читается с реплики-зеркала основной базы."""
+
+    databases = '__all__'
+
+    def test_list_reads_from_replica(self):
+        FoodgramUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Имя', last_name='Фамилия', password='pass12345!'
+        )
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            with CaptureQueriesContext(connections['default']) as primary:
+                response = APIClient().get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+        self.assertFalse([
+            query for query in primary.captured_queries
+            if 'recipes_recipe' in query['sql']
+        ])
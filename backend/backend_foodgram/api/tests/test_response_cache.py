@@ -0,0 +1,81 @@
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import response_cache
+from recipes.models import Tag
+
+URL = '/api/tags/'
+
+
+class ResponseCacheLockTest(TestCase):
+    """Пока ответ формирует другой процесс, запрос не ждет его долго."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.TemporaryDirectory()
+        cls.cache_settings = override_settings(
+            CACHES={'default': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cls.cache_dir.name,
+            }},
+            REPLICA_WEIGHTS={},
+        )
+        cls.cache_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.cache_settings.disable()
+        cls.cache_dir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+        self.client = APIClient()
+
+    def get_locked(self):
+        """Запрос, пока блокировку ключа держит другой процесс."""
+        with mock.patch.object(cache, 'add', return_value=False), \
+                mock.patch.object(response_cache.time, 'sleep') as sleep:
+            return self.client.get(URL), sleep
+
+    def test_stale_response_is_served_while_locked(self):
+        self.assertEqual(self.client.get(URL)['X-Cache'], 'MISS')
+        # Сигналы сбрасывают версию только после фиксации транзакции.
+        Tag.objects.create(name='Обед', slug='lunch')
+        response_cache.bump_cache_version('tags')
+        response, sleep = self.get_locked()
+        self.assertEqual(response['X-Cache'], 'STALE')
+        self.assertEqual(len(response.json()), 1)
+        self.assertNotIn('ETag', response)
+        sleep.assert_not_called()
+
+    def test_locked_miss_waits_once_and_renders(self):
+        response, sleep = self.get_locked()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Cache', response)
+        sleep.assert_called_once_with(response_cache.LOCK_WAIT)
+        self.assertEqual(self.client.get(URL)['X-Cache'], 'MISS')
+
+    def test_cached_recipe_list_needs_no_queries(self):
+        url = '/api/recipes/'
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            hit = self.client.get(url)
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=first['ETag']
+            )
+        self.assertEqual(hit['X-Cache'], 'HIT')
+        self.assertEqual(not_modified.status_code, 304)
+        response_cache.bump_cache_version('recipes')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code,
+            200
+        )
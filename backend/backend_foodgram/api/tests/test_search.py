@@ -0,0 +1,168 @@
+from unittest import skipUnless
+
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.search import (CONFIG, InMemoryRecipeSearch, PostgresRecipeSearch,
+                        get_recipe_search, memory_search, stem, tokenize)
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                            Tag)
+from user.models import FoodgramUser
+
+
+class TokenizeTest(SimpleTestCase):
+    """Разбор текста на основы слов."""
+
+    def test_stem(self):
+        self.assertEqual(stem('курица'), 'куриц')
+        self.assertEqual(stem('курицей'), 'куриц')
+        self.assertEqual(stem('морковями'), 'морков')
+        # Основа не короче MIN_STEM букв.
+        self.assertEqual(stem('ели'), 'ели')
+
+    def test_tokenize(self):
+        self.assertEqual(
+            tokenize('Суп с Курицей, ЁЖИКИ_2!'),
+            ['суп', 'с', 'куриц', 'ежик', '2']
+        )
+        self.assertEqual(tokenize(None), [])
+
+
+class RecipeSearchData:
+
+    @classmethod
+    def setUpTestData(cls):
+        author = FoodgramUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='pass12345!'
+        )
+        cls.tag = Tag.objects.create(name='Обед', slug='lunch')
+        cls.ingredient = Ingredient.objects.create(
+            name='Курица', measurement_unit='г'
+        )
+        rice = Ingredient.objects.create(name='Рис', measurement_unit='г')
+        cls.recipes = {}
+        for name, text, ingredients in (
+            ('Курица с рисом', 'Варить', [rice]),
+            ('Плов', 'Жарить', [cls.ingredient, rice]),
+            ('Суп', 'Добавить курицу', []),
+            ('Салат', 'Нарезать', []),
+        ):
+            recipe = Recipe.objects.create(
+                author=author, name=name, text=text, cooking_time=10,
+                image='recipes/images/test.png'
+            )
+            RecipeTag.objects.create(recipe=recipe, tag=cls.tag)
+            for ingredient in ingredients:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+            cls.recipes[name] = recipe.id
+        # Сигналы обновляют поиск только после фиксации транзакции.
+        if connection.vendor == 'postgresql':
+            PostgresRecipeSearch().update(cls.recipes.values())
+
+    def names(self, queryset):
+        names = {recipe_id: name for name, recipe_id in self.recipes.items()}
+        return [names[recipe.id] for recipe in queryset]
+
+
+class InMemoryRecipeSearchTest(RecipeSearchData, TestCase):
+    """Индекс рецептов в памяти."""
+
+    def setUp(self):
+        self.search = InMemoryRecipeSearch()
+
+    def find(self, query):
+        return self.names(self.search.search(Recipe.objects.all(), query))
+
+    def test_rank_follows_field_weights(self):
+        # Название, затем ингредиенты, затем описание.
+        self.assertEqual(
+            self.find('курица'), ['Курица с рисом', 'Плов', 'Суп']
+        )
+        self.assertEqual(self.search.scores('курица'), {
+            self.recipes['Курица с рисом']: 1.0,
+            self.recipes['Плов']: 0.2,
+            self.recipes['Суп']: 0.1,
+        })
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.find('курица рис'), ['Курица с рисом', 'Плов'])
+        self.assertEqual(self.find('курица салат'), [])
+        self.assertEqual(self.find('обед'), [
+            'Салат', 'Суп', 'Плов', 'Курица с рисом'
+        ])
+
+    def test_update_after_recipe_rename(self):
+        self.find('курица')
+        recipe_id = self.recipes['Салат']
+        Recipe.objects.filter(pk=recipe_id).update(name='Салат с курицей')
+        self.search.update([recipe_id])
+        self.assertEqual(self.find('курица')[:2], ['Салат', 'Курица с рисом'])
+        self.assertEqual(self.find('нарезать'), ['Салат'])
+
+    def test_update_after_tag_and_ingredient_rename(self):
+        self.find('обед')
+        Tag.objects.filter(pk=self.tag.pk).update(name='Ужин')
+        Ingredient.objects.filter(pk=self.ingredient.pk).update(name='Утка')
+        self.search.update(self.recipes.values())
+        self.assertEqual(self.find('обед'), [])
+        self.assertEqual(len(self.find('ужин')), 4)
+        self.assertEqual(self.find('утка'), ['Плов'])
+        self.assertEqual(self.find('курица'), ['Курица с рисом', 'Суп'])
+
+
+@override_settings(REPLICA_WEIGHTS={})
+class RecipeSearchEndpointTest(RecipeSearchData, TestCase):
+    """Параметр ?q= списка рецептов."""
+
+    def setUp(self):
+        memory_search._postings = None
+        self.addCleanup(setattr, memory_search, '_postings', None)
+
+    def test_search(self):
+        response = APIClient().get('/api/recipes/', {'q': 'курица'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['name'] for recipe in response.data['results']],
+            ['Курица с рисом', 'Плов', 'Суп']
+        )
+        self.assertEqual(
+            APIClient().get(
+                '/api/recipes/', {'q': 'курица салат'}
+            ).data['results'],
+            []
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Нужен PostgreSQL.')
+class PostgresRecipeSearchTest(RecipeSearchData, TestCase):
+    """Recipe.search_vector из названия, тегов, ингредиентов и описания."""
+
+    def find(self, query):
+        return self.names(Recipe.objects.filter(
+            search_vector=SearchQuery(query, config=CONFIG)
+        ).order_by('id'))
+
+    def test_vector_includes_tags_and_ingredients(self):
+        self.assertIsInstance(get_recipe_search(), PostgresRecipeSearch)
+        vector = Recipe.objects.values_list(
+            'search_vector', flat=True
+        ).get(pk=self.recipes['Плов'])
+        self.assertIn("'обед':", vector)
+        self.assertIn("'куриц':", vector)
+        self.assertEqual(len(self.find('обед')), 4)
+        self.assertEqual(
+            self.find('курица'), ['Курица с рисом', 'Плов', 'Суп']
+        )
+
+    def test_update_after_tag_and_ingredient_rename(self):
+        Tag.objects.filter(pk=self.tag.pk).update(name='Ужин')
+        Ingredient.objects.filter(pk=self.ingredient.pk).update(name='Утка')
+        PostgresRecipeSearch().update(self.recipes.values())
+        self.assertEqual(self.find('обед'), [])
+        self.assertEqual(len(self.find('ужин')), 4)
+        self.assertEqual(self.find('утка'), ['Плов'])
@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from api.signals import on_commit_batch
+from user.models import FoodgramUser
+
+
+class OnCommitBatchTest(TestCase):
+    """Значения одной транзакции обрабатываются одним вызовом."""
+
+    def test_values_are_collected_in_one_callback(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for value in (1, 2, 2, 3):
+                on_commit_batch('test', calls.append, value)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(calls, [{1, 2, 3}])
+
+    def test_rolled_back_savepoint_values_are_dropped(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_batch('test', calls.append, 1)
+            try:
+                with transaction.atomic():
+                    on_commit_batch('test', calls.append, 2)
+                    raise ValueError
+            except ValueError:
+                pass
+            on_commit_batch('test', calls.append, 3)
+        self.assertNotIn(2, set().union(*calls))
+        self.assertEqual(set().union(*calls), {1, 3})
+
+
+class OnCommitBatchTransactionTest(TransactionTestCase):
+    """
+    Настоящие фиксации и откаты. Проверяет и внутренние атрибуты
+    соединения, на которые опирается on_commit_batch.
+    """
+
+    def test_queue_is_replaced_on_commit_and_rollback(self):
+        with transaction.atomic():
+            queue = connection.run_on_commit
+            transaction.on_commit(lambda: None)
+            self.assertIs(connection.run_on_commit, queue)
+            self.assertEqual(len(queue), 1)
+        self.assertIsNot(connection.run_on_commit, queue)
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                queue = connection.run_on_commit
+                transaction.on_commit(lambda: None)
+                raise ValueError
+        self.assertIsNot(connection.run_on_commit, queue)
+
+    def test_savepoint_ids_follow_nesting(self):
+        with transaction.atomic():
+            outer = list(connection.savepoint_ids)
+            with transaction.atomic():
+                self.assertEqual(len(connection.savepoint_ids), len(outer) + 1)
+            self.assertEqual(connection.savepoint_ids, outer)
+
+    def test_rolled_back_batch_does_not_leak(self):
+        calls = []
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                on_commit_batch('test', calls.append, 1)
+                raise ValueError
+        with transaction.atomic():
+            on_commit_batch('test', calls.append, 2)
+        with transaction.atomic():
+            on_commit_batch('test', calls.append, 3)
+        self.assertEqual(calls, [{2}, {3}])
+
+
+@mock.patch('api.signals.invalidate_responses')
+class AuthorResponsesTest(TestCase):
+    """Кеш рецептов сбрасывают только видимые в них поля автора."""
+
+    def setUp(self):
+        self.author = FoodgramUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='pass12345!'
+        )
+        FoodgramUser.objects.filter(pk=self.author.pk).update(
+            recipes_count=1
+        )
+        self.author.refresh_from_db()
+
+    def test_created_user_and_user_without_recipes(self, invalidate):
+        user = FoodgramUser.objects.create_user(
+            email='user@example.com', username='user',
+            first_name='Имя', last_name='Фамилия', password='pass12345!'
+        )
+        user.first_name = 'Другое'
+        user.save()
+        invalidate.assert_not_called()
+
+    def test_hidden_fields(self, invalidate):
+        self.author.set_password('new12345!')
+        self.author.save()
+        self.author.save(update_fields=['password'])
+        invalidate.assert_not_called()
+
+    def test_shown_fields(self, invalidate):
+        self.author.first_name = 'Другое'
+        self.author.save()
+        invalidate.assert_called_once_with('recipes')
+        self.author.username = 'renamed'
+        self.author.save(update_fields=['username'])
+        self.assertEqual(invalidate.call_count, 2)
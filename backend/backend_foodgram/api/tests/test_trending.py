@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import trending
+from recipes.models import (Favorite, Recipe, ShoppingCart, TrendingRecipe,
+                            TrendingRun)
+from user.models import FoodgramUser
+
+WINDOW = timedelta(days=7)
+HALF_LIFE = timedelta(hours=24)
+
+
+@override_settings(
+    REPLICA_WEIGHTS={}, TRENDING_WINDOW_DAYS=7, TRENDING_HALF_LIFE_HOURS=24
+)
+class TrendingTest(TestCase):
+    """Рейтинг рецептов по давности добавлений в избранное и покупки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = FoodgramUser.objects.create_user(
+            email='user@example.com', username='user',
+            first_name='Имя', last_name='Фамилия', password='pass12345!'
+        )
+        cls.recipes = {
+            name: Recipe.objects.create(
+                author=user, name=name, text='Текст', cooking_time=10,
+                image='recipes/images/test.png'
+            ).id
+            for name in ('fresh', 'older', 'expired', 'quiet')
+        }
+        cls.now = timezone.now()
+        for model, name, age in (
+            (Favorite, 'fresh', timedelta()),
+            (ShoppingCart, 'older', timedelta()),
+            (Favorite, 'older', 2 * HALF_LIFE),
+            (Favorite, 'expired', WINDOW + timedelta(days=1)),
+        ):
+            event = model.objects.create(
+                user=user, recipe_id=cls.recipes[name]
+            )
+            model.objects.filter(pk=event.pk).update(created=cls.now - age)
+
+    def test_decayed_scores(self):
+        scores, events = trending.decayed_scores(self.now, WINDOW, HALF_LIFE)
+        self.assertEqual(events, 3)
+        self.assertEqual(set(scores), {
+            self.recipes['fresh'], self.recipes['older']
+        })
+        self.assertAlmostEqual(scores[self.recipes['fresh']], 1.0)
+        # Покупка весит 0.5, избранное двух периодов полураспада — 0.25.
+        self.assertAlmostEqual(scores[self.recipes['older']], 0.75)
+
+    def test_compute_trending(self):
+        run = trending.compute_trending()
+        self.assertEqual(TrendingRun.objects.get(), run)
+        self.assertEqual((run.events, run.recipes), (3, 2))
+        self.assertGreaterEqual(run.started, self.now)
+        self.assertGreaterEqual(run.duration, 0)
+        self.assertEqual(
+            list(TrendingRecipe.objects.order_by('-score').values_list(
+                'recipe_id', flat=True
+            )),
+            [self.recipes['fresh'], self.recipes['older']]
+        )
+        response = APIClient().get('/api/recipes/', {'ordering': 'trending'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['name'] for recipe in response.data['results']],
+            ['fresh', 'older']
+        )
+
+    def test_recipe_deleted_during_run(self):
+        decayed_scores = trending.decayed_scores
+
+        def delete_during_run(*args):
+            result = decayed_scores(*args)
+            Recipe.objects.filter(pk=self.recipes['fresh']).delete()
+            return result
+
+        with mock.patch.object(
+            trending, 'decayed_scores', delete_during_run
+        ):
+            run = trending.compute_trending()
+        self.assertEqual(run.recipes, 1)
+        self.assertEqual(
+            list(TrendingRecipe.objects.values_list('recipe_id', flat=True)),
+            [self.recipes['older']]
+        )
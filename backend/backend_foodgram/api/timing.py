@@ -0,0 +1,206 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+logger = logging.getLogger('api.timing')
+
+_timings = ContextVar('timings', default=None)
+
+# Порядок метрик в заголовке Server-Timing и в строке журнала.
+PHASES = ('db', 'serialize', 'render', 'view', 'total')
+
+
+class RequestTimings:
+    """
+    Время фаз одного запроса.
+
+    Пока замер не включен через start(), measure() и add() ничего
+    не записывают, поэтому неотобранные запросы почти ничего не стоят.
+    Запросы к базе считаются обертками execute_wrapper на всех
+    подключениях, включая реплики.
+    """
+
+    def __init__(self, sampled):
+        self.sampled = sampled
+        self.staff = False
+        self.queries = 0
+        self.durations = {}
+        self._stack = None
+        self._open = set()
+
+    @property
+    def enabled(self):
+        return self._stack is not None
+
+    def start(self):
+        if self._stack is not None:
+            return
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self._execute)
+            )
+
+    def stop(self):
+        if self._stack is not None:
+            self._stack.close()
+
+    def _execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - start)
+
+    def add(self, name, duration):
+        if self.enabled:
+            self.durations[name] = self.durations.get(name, 0) + duration
+
+    @contextmanager
+    def measure(self, name):
+        """Замер фазы; вложенные замеры той же фазы не суммируются."""
+        if not self.enabled or name in self._open:
+            yield
+            return
+        self._open.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._open.discard(name)
+            self.add(name, time.perf_counter() - start)
+
+    def milliseconds(self):
+        return {
+            name: round(self.durations.get(name, 0) * 1000, 2)
+            for name in PHASES
+        }
+
+    def header(self):
+        parts = []
+        for name, value in self.milliseconds().items():
+            if name == 'db':
+                parts.append(f'db;dur={value};desc="{self.queries} queries"')
+            elif name in self.durations:
+                parts.append(f'{name};dur={value}')
+        return ', '.join(parts)
+
+
+@contextmanager
+def measure(name):
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.measure(name):
+        yield
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет время запроса: базу, сериализацию, рендеринг и view.
+
+    Доля SERVER_TIMING_SAMPLE_RATE запросов замеряется и пишется
+    строкой JSON в журнал api.timing. Заголовок Server-Timing
+    отдается при SERVER_TIMING_HEADER или сотрудникам (см.
+    TimingMixin). Работает и под WSGI, и под ASGI: Django выполняет
+    синхронные middleware и представления в одном потоке, а замеры
+    хранятся в ContextVar.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        timings = RequestTimings(
+            random.random() < settings.SERVER_TIMING_SAMPLE_RATE
+        )
+        if timings.sampled or settings.SERVER_TIMING_HEADER:
+            timings.start()
+        token = _timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+            timings.stop()
+        if not timings.enabled:
+            return response
+        timings.add('total', time.perf_counter() - start)
+        if settings.SERVER_TIMING_HEADER or timings.staff:
+            response['Server-Timing'] = timings.header()
+        if timings.sampled:
+            match = request.resolver_match
+            logger.info(json.dumps({
+                'route': match.view_name if match else None,
+                'method': request.method,
+                'status': response.status_code,
+                'queries': timings.queries,
+                **{
+                    f'{name}_ms': value
+                    for name, value in timings.milliseconds().items()
+                },
+            }))
+        return response
+
+
+class TimingMixin:
+    """
+    Замер времени представления DRF.
+
+    Для сотрудников замер включается после аутентификации, даже если
+    запрос не попал в выборку, чтобы они всегда видели Server-Timing.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            timings = _timings.get()
+            if timings is not None:
+                timings.add('view', time.perf_counter() - start)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        timings = _timings.get()
+        if timings is not None and request.user.is_staff:
+            timings.staff = True
+            timings.start()
+
+
+class TimedSerializerMixin:
+    """Замер сериализации; вложенные сериализаторы не считаются дважды."""
+
+    def to_representation(self, instance):
+        timings = _timings.get()
+        if timings is None or not timings.enabled:
+            return super().to_representation(instance)
+        with timings.measure('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure('render'):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+
+class TimedBrowsableAPIRenderer(BrowsableAPIRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure('render'):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
@@ -0,0 +1,163 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from rest_framework import exceptions, serializers
+from rest_framework.authentication import TokenAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from user.models import FoodgramUser, RevokedToken
+from .metrics import record_cache
+
+# Поля пользователя, которые хранятся в подписанном токене.
+USER_CLAIMS = ('username', 'is_staff', 'is_superuser', 'is_active')
+SESSION_CLAIM = 'sid'
+INVALID_TOKEN_MESSAGE = 'Недействительный токен.'
+
+
+class RevocationList:
+    """
+    Идентификаторы отозванных сессий в памяти процесса.
+
+    Перечитывается из RevokedToken раз в AUTH_REVOCATION_REFRESH секунд;
+    отзыв в текущем процессе виден сразу, в остальных — после
+    перечитывания.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked = None
+        self._loaded_at = 0
+
+    def _load(self):
+        ttl = settings.AUTH_REVOCATION_REFRESH
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > ttl
+            record_cache(
+                'revocation_list', self._revoked is not None and not expired
+            )
+            if self._revoked is None or expired:
+                self._revoked = frozenset(RevokedToken.objects.filter(
+                    expires_at__gt=timezone.now()
+                ).values_list('jti', flat=True))
+                self._loaded_at = time.monotonic()
+            return self._revoked
+
+    def is_revoked(self, jti):
+        return jti in self._load()
+
+    def revoke(self, jti, expires_at):
+        RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        RevokedToken.objects.get_or_create(
+            jti=jti, defaults={'expires_at': expires_at}
+        )
+        with self._lock:
+            if self._revoked is not None:
+                self._revoked = self._revoked | {jti}
+
+
+revocation_list = RevocationList()
+
+
+def access_token(refresh, user):
+    """Токен доступа сессии refresh с данными пользователя."""
+    access = refresh.access_token
+    for claim in USER_CLAIMS:
+        access[claim] = getattr(user, claim)
+    access[SESSION_CLAIM] = refresh['jti']
+    return access
+
+
+def token_user(token):
+    """
+    Пользователь из утверждений токена без запроса к базе.
+
+    Остальные поля отложены: Django загрузит их при первом обращении.
+    """
+    claims = {
+        'id': token[api_settings.USER_ID_CLAIM],
+        **{claim: token[claim] for claim in USER_CLAIMS},
+    }
+    fields = [
+        field.attname for field in FoodgramUser._meta.concrete_fields
+        if field.attname in claims
+    ]
+    return FoodgramUser.from_db(
+        DEFAULT_DB_ALIAS, fields, [claims[field] for field in fields]
+    )
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Заголовок «Token <ключ>» с подписанным или обычным токеном.
+
+    Подписанный токен проверяется по подписи, сроку и списку отзыва
+    в памяти. Обычные токены rest_framework.authtoken ищутся в базе,
+    пока включен AUTH_LEGACY_TOKENS.
+    """
+
+    def authenticate_credentials(self, key):
+        if key.count('.') != 2:
+            if not settings.AUTH_LEGACY_TOKENS:
+                raise exceptions.AuthenticationFailed(INVALID_TOKEN_MESSAGE)
+            return super().authenticate_credentials(key)
+        try:
+            token = AccessToken(key)
+        except TokenError:
+            raise exceptions.AuthenticationFailed(INVALID_TOKEN_MESSAGE)
+        if revocation_list.is_revoked(token.get(SESSION_CLAIM)):
+            raise exceptions.AuthenticationFailed('Токен отозван.')
+        return token_user(token), token
+
+
+class AuthTokenSerializer(serializers.Serializer):
+    """
+    Ответ входа djoser: обычный токен или пара подписанных.
+
+    Ключ auth_token сохраняется в обоих режимах, поэтому клиентам
+    достаточно передавать его как раньше.
+    """
+
+    def to_representation(self, token):
+        if settings.AUTH_TOKEN_MODE != 'signed':
+            return {'auth_token': token.key}
+        refresh = RefreshToken.for_user(token.user)
+        return {
+            'auth_token': str(access_token(refresh, token.user)),
+            'refresh': str(refresh),
+        }
+
+
+class RefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError:
+            raise serializers.ValidationError(
+                {'refresh': INVALID_TOKEN_MESSAGE}
+            )
+        if revocation_list.is_revoked(refresh['jti']):
+            raise serializers.ValidationError({'refresh': 'Токен отозван.'})
+        user = FoodgramUser.objects.filter(
+            pk=refresh[api_settings.USER_ID_CLAIM], is_active=True
+        ).first()
+        if user is None:
+            raise serializers.ValidationError(
+                {'refresh': 'Пользователь не найден.'}
+            )
+        return {'auth_token': str(access_token(refresh, user))}
+
+
+def revoke_session(token):
+    """Отзывает сессию подписанного токена до конца ее срока."""
+    if isinstance(token, AccessToken):
+        revocation_list.revoke(
+            token[SESSION_CLAIM],
+            timezone.now() + RefreshToken.lifetime,
+        )
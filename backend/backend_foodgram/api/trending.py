@@ -0,0 +1,95 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import (Favorite, Recipe, ShoppingCart, TrendingRecipe,
+                            TrendingRun)
+from .response_cache import bump_cache_version
+
+# Группа кеша списков, порядок которых зависит от счетчиков
+# избранного и покупок или от TrendingRecipe.
+RANKING_GROUP = 'ranking'
+RANKED_ORDERINGS = ('popular', 'trending')
+
+# Вклад одного события в рейтинг без учета давности.
+EVENTS = (
+    (Favorite, 1.0),
+    (ShoppingCart, 0.5),
+)
+BATCH_SIZE = 1000
+
+
+def decayed_scores(now, window, half_life):
+    """
+    Считает рейтинг рецептов по событиям за окно window.
+
+    Каждое добавление в избранное или список покупок весит тем меньше,
+    чем оно старше: вдвое за каждые half_life. Возвращает
+    ({id рецепта: рейтинг}, число обработанных событий).
+    """
+    since = now - window
+    half_life = half_life.total_seconds()
+    scores = defaultdict(float)
+    events = 0
+    for model, weight in EVENTS:
+        for recipe_id, created in model.objects.filter(
+            created__gte=since
+        ).values_list('recipe_id', 'created').iterator():
+            age = max((now - created).total_seconds(), 0)
+            scores[recipe_id] += weight * 0.5 ** (age / half_life)
+            events += 1
+    return scores, events
+
+
+def existing_recipe_ids(recipe_ids):
+    """Id рецептов, которые еще есть в базе, пачками по BATCH_SIZE."""
+    recipe_ids = list(recipe_ids)
+    existing = set()
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        existing.update(Recipe.objects.filter(
+            pk__in=recipe_ids[start:start + BATCH_SIZE]
+        ).values_list('id', flat=True))
+    return existing
+
+
+def compute_trending():
+    """
+    Пересчитывает TrendingRecipe целиком и записывает TrendingRun.
+
+    Таблица заменяется в одной транзакции, поэтому читатели видят либо
+    старый, либо новый рейтинг.
+    """
+    started = timezone.now()
+    start = time.monotonic()
+    scores, events = decayed_scores(
+        started,
+        timedelta(days=settings.TRENDING_WINDOW_DAYS),
+        timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS),
+    )
+    with transaction.atomic():
+        # Рецепт могли удалить, пока считался рейтинг.
+        existing = existing_recipe_ids(scores)
+        scores = {
+            recipe_id: score for recipe_id, score in scores.items()
+            if recipe_id in existing
+        }
+        TrendingRecipe.objects.all().delete()
+        TrendingRecipe.objects.bulk_create(
+            (
+                TrendingRecipe(recipe_id=recipe_id, score=score)
+                for recipe_id, score in scores.items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        run = TrendingRun.objects.create(
+            started=started,
+            duration=time.monotonic() - start,
+            events=events,
+            recipes=len(scores),
+        )
+        transaction.on_commit(lambda: bump_cache_version(RANKING_GROUP))
+    return run
@@ -5,7 +5,7 @@ from django.conf.urls.static import static
 
 from .views import (
     UserViewSet, UserAvatarView, ShowSubscriptionsView, SubscribeView,
-    IngredientViewSet,
+    IngredientViewSet, HealthView, TokenRefreshView,
     RecipeViewSet, TagViewSet,
 )
 
@@ -19,7 +19,18 @@ router.register('tags', TagViewSet, basename='tags')
 
 
 urlpatterns = [
+    path('health/', HealthView.as_view(), name='health'),
+    path(
+        'users/subscriptions/',
+        ShowSubscriptionsView.as_view(),
+        name='subscriptions'
+    ),
     path('', include('djoser.urls')),
+    path(
+        'auth/token/refresh/',
+        TokenRefreshView.as_view(),
+        name='token-refresh'
+    ),
     path('auth/', include('djoser.urls.authtoken')),
     path('users/me/avatar/', UserAvatarView.as_view(), name='user-avatar'),
     path('', include(router.urls)),
@@ -28,10 +39,5 @@ urlpatterns = [
         SubscribeView.as_view(),
         name='subscribe'
     ),
-    path(
-        'users/subscriptions/',
-        ShowSubscriptionsView.as_view(),
-        name='subscriptions'
-    ),
 ]
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,63 @@
+from django.utils.functional import cached_property
+
+from recipes.models import Favorite, ShoppingCart
+from user.models import Subscription
+
+
+class ViewerContext:
+    """
+    Подписки, избранное и список покупок текущего пользователя.
+
+    Каждое множество загружается одним запросом при первом обращении
+    и переиспользуется всеми сериализаторами в рамках запроса.
+    Для анонимного пользователя запросы к базе не выполняются.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_anonymous = user is None or user.is_anonymous
+
+    def _ids(self, queryset, field):
+        if self.is_anonymous:
+            return frozenset()
+        return frozenset(
+            queryset.filter(user=self.user).values_list(field, flat=True)
+        )
+
+    @cached_property
+    def subscribed_ids(self):
+        return self._ids(Subscription.objects, 'author_id')
+
+    @cached_property
+    def favorite_ids(self):
+        return self._ids(Favorite.objects, 'recipe_id')
+
+    @cached_property
+    def shopping_cart_ids(self):
+        return self._ids(ShoppingCart.objects, 'recipe_id')
+
+
+def get_viewer(request):
+    """Возвращает контекст пользователя, сохраненный в запросе."""
+    if request is None:
+        return ViewerContext(None)
+    viewer = getattr(request, 'viewer_context', None)
+    if viewer is None:
+        viewer = ViewerContext(request.user)
+        request.viewer_context = viewer
+    return viewer
+
+
+class ViewerFlagsMixin:
+    """
+    Чтение признаков текущего пользователя в сериализаторах.
+
+    Значение берется из аннотации queryset (см. api.querysets),
+    а для объектов без аннотации — из ViewerContext запроса.
+    """
+
+    def get_viewer_flag(self, obj, annotation, ids):
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
+        viewer = get_viewer(self.context.get('request'))
+        return obj.pk in getattr(viewer, ids)
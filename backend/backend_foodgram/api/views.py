@@ -1,29 +1,48 @@
+from django.db import DatabaseError, connection
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum
-from django.http import HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.http import (HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.decorators import api_view
-from rest_framework import viewsets, filters
+from rest_framework import viewsets
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 
 from recipes.models import (
-    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag)
-from .filters import IngredientFilter, RecipeFilter
+    Favorite, Ingredient, Recipe, ShoppingCart, Tag)
+from .filters import RecipeFilter
 from .permissions import IsAuthorOrAdminOrReadOnly
 from user.models import FoodgramUser, Subscription
 from .serializers import (
     UserSerializer, UserAvatarSerializer,
     SubscriptionSerializer, ShowSubscriptionsSerializer, FavoriteSerializer,
     IngredientSerializer, RecipeSerializer,
-    TagSerializer, RecipeShortSerializer,
+    TagSerializer, RecipeShortSerializer, RecipeMatchSerializer,
     RecipeCreateUpdateSerializer,
 )
-from .pagination import CustomPagination
+from .conditional import ConditionalGetMixin, record_conditional
+from .feed import filter_feed
+from .ingredient_index import ingredient_index
+from .ingredient_match import ingredient_match_index
+from .metrics import render_metrics
+from .pagination import (CustomPagination, FeedPagination, MatchPagination,
+                         SubscriptionsPagination)
+from .querysets import (annotate_users, attach_recent_recipes,
+                        get_recipe_queryset, get_subscriptions_queryset)
+from .renderers import SHOPPING_LIST_RENDERERS
+from .replicas import ReplicaReadMixin
+from .response_cache import (ResponseCacheMixin, cache_is_shared,
+                             get_cache_version)
+from .tokens import RefreshSerializer
+from .shopping_list import export_shopping_list, get_shopping_list_version
+from .timing import TimingMixin
+from .trending import RANKED_ORDERINGS, RANKING_GROUP
 
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
@@ -50,6 +69,9 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(user)
         return Response(serializer.data)
 
+    def get_queryset(self):
+        return annotate_users(super().get_queryset(), self.request.user)
+
     def get_object(self):
         return self.request.user
 
@@ -103,15 +125,63 @@ class SubscribeView(APIView):
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
-class ShowSubscriptionsView(ListAPIView):
+class TokenRefreshView(APIView):
+    """Новый токен доступа по токену обновления подписанной сессии."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = RefreshSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.validated_data)
+
+
+class HealthView(APIView):
+    """Доступность базы и статистика пула соединений воркера."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError:
+            return Response(
+                {'database': 'unavailable'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        pool = getattr(connection, 'pool', None)
+        return Response({
+            'database': 'ok',
+            'pool': pool.stats() if pool is not None else None,
+        })
+
+
+class MetricsView(APIView):
+    """Метрики Prometheus всех воркеров."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        content, content_type = render_metrics()
+        return HttpResponse(content, content_type=content_type)
+
+
+class ShowSubscriptionsView(TimingMixin, ReplicaReadMixin, ListAPIView):
 
     permission_classes = [IsAuthenticated, ]
-    pagination_class = CustomPagination
+    pagination_class = SubscriptionsPagination
 
     def get(self, request):
-        user = request.user
-        queryset = FoodgramUser.objects.filter(author__user=user)
+        queryset = get_subscriptions_queryset(request.user)
         page = self.paginate_queryset(queryset)
+        limit = request.query_params.get('recipes_limit')
+        attach_recent_recipes(
+            page, int(limit) if limit and limit.isdigit() else None
+        )
         serializer = ShowSubscriptionsSerializer(
             page, many=True, context={'request': request}
         )
@@ -153,34 +223,52 @@ class FavoriteView(APIView):
         )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadMixin, ConditionalGetMixin, ResponseCacheMixin,
+                 viewsets.ReadOnlyModelViewSet):
 
     permission_classes = [AllowAny, ]
     pagination_class = None
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
+    cache_group = 'tags'
+    cache_authenticated = True
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                        ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
 
     permission_classes = [AllowAny, ]
     pagination_class = None
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
-    filter_backends = [IngredientFilter, ]
-    search_fields = ['^name', ]
+    cache_group = 'ingredients'
+    cache_authenticated = True
+
+    def get_list_validators(self, request, *args, **kwargs):
+        return (ingredient_index.signature,), None
+
+    def filter_queryset(self, queryset):
+        """Поиск ингредиентов по началу названия через индекс в памяти."""
+        if self.action != 'list':
+            return super().filter_queryset(queryset)
+        limit = self.request.query_params.get('limit')
+        return ingredient_index.search(
+            self.request.query_params.get('name', ''),
+            limit=int(limit) if limit and limit.isdigit() else None
+        )
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(TimingMixin, ReplicaReadMixin, ConditionalGetMixin,
+                    ResponseCacheMixin, viewsets.ModelViewSet):
     """Класс для работы с рецептами."""
 
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     pagination_class = CustomPagination
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    search_fields = ('name', 'author__username', 'tags__name')
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
+    cache_group = 'recipes'
 
     @action(
         detail=True,
@@ -206,6 +294,68 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return self.add_to(ShoppingCart, request.user, recipe.id)
         return self.remove_from(ShoppingCart, request.user, recipe.id)
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request, *args, **kwargs):
+        """Рецепты авторов из подписок, новые первыми, по курсору."""
+        page = self.paginate_queryset(filter_feed(
+            get_recipe_queryset(request.user), request.user
+        ))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        pagination_class=MatchPagination,
+    )
+    def match(self, request, *args, **kwargs):
+        """
+        Рецепты из имеющихся ингредиентов ?ingredients=1,2,3.
+
+        Сортируются по доле ингредиентов рецепта, которые есть
+        у пользователя, затем по числу совпадений.
+        """
+        matches = ingredient_match_index.match(
+            self.get_ingredient_ids(request)
+        )
+        page = self.paginate_queryset(matches)
+        recipes = get_recipe_queryset(request.user).in_bulk(
+            [recipe_id for recipe_id, *_ in page]
+        )
+        results = []
+        for recipe_id, coverage, matched, _ in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.coverage = round(coverage, 4)
+                recipe.matched_ingredients = matched
+                results.append(recipe)
+        serializer = RecipeMatchSerializer(
+            results, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def get_ingredient_ids(request):
+        try:
+            ingredient_ids = {
+                int(part)
+                for value in request.query_params.getlist('ingredients')
+                for part in value.split(',')
+                if part.strip()
+            }
+        except ValueError:
+            ingredient_ids = None
+        if not ingredient_ids:
+            raise ValidationError({
+                'ingredients': 'Передайте id ингредиентов через запятую.'
+            })
+        return ingredient_ids
+
     @action(
         detail=True,
         methods=['get'],
@@ -230,37 +380,69 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
     )
-    def download_shopping_cart(self, request):
-        """Метод для скачивания списка покупок."""
-        ingredients = (
-            Recipe.objects.filter(in_shopping_cart__user=request.user)
-            .values(
-                'ingredients__name',
-                'ingredients__measurement_unit'
+    def download_shopping_cart(self, request, *args, **kwargs):
+        """Метод для скачивания списка покупок в формате ?format=."""
+        renderer = request.accepted_renderer
+        version = get_shopping_list_version(request.user.id)
+        etag = f'"{request.user.id}-{version!r}-{renderer.format}"'
+        last_modified = int(version)
+        shared = cache_is_shared()
+        response = None
+        if shared:
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
             )
-            .annotate(total_amount=Sum('recipeingredient__amount'))
-            .order_by('ingredients__name')
-        )
-
-        shopping_list = ['Список покупок:\n\n']
-        for ingredient in ingredients:
-            shopping_list.append(
-                f"- {ingredient['ingredients__name']} "
-                f"({ingredient['ingredients__measurement_unit']}) — "
-                f"{ingredient['total_amount']}\n"
+            record_conditional(request, response)
+        if response is None:
+            response = StreamingHttpResponse(
+                export_shopping_list(
+                    request.user, renderer.format, version
+                ),
+                content_type=(
+                    f'{renderer.media_type}; charset={renderer.charset}'
+                    if renderer.charset else renderer.media_type
+                )
             )
-
-        response = HttpResponse(
-            ''.join(shopping_list),
-            content_type='text/plain; charset=utf-8'
-        )
-        response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
-        )
+            response['Content-Disposition'] = (
+                f'attachment; filename="shopping_list.{renderer.format}"'
+            )
+        if shared:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
         return response
 
+    def get_ranking_version(self, request):
+        """Версия рейтинга для списков, упорядоченных по нему."""
+        if request.query_params.get('ordering') in RANKED_ORDERINGS:
+            return get_cache_version(RANKING_GROUP)
+        return None
+
+    def get_response_cache_versions(self, request):
+        versions = super().get_response_cache_versions(request)
+        version = self.get_ranking_version(request)
+        return versions if version is None else (*versions, version)
+
+    def get_list_validators(self, request, *args, **kwargs):
+        """
+        Версия рейтинга для списков, упорядоченных по нему.
+
+        Остальные изменения рецептов меняют версию группы recipes,
+        которая уже входит в ETag, поэтому база не опрашивается и
+        ответ из кеша обходится без запросов.
+        """
+        version = self.get_ranking_version(request)
+        return (version,), version
+
+    def get_queryset(self):
+        """Метод для получения рецептов с данными для сериализации."""
+        if self.action in ['list', 'retrieve']:
+            return get_recipe_queryset(self.request.user)
+        return super().get_queryset()
+
     def get_permissions(self):
         """Метод для проверки прав доступа."""
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -297,24 +479,3 @@ class RecipeViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'detail': str(e)},
                             status=status.HTTP_400_BAD_REQUEST)
-
-
-@api_view(['GET'])
-def download_shopping_cart(request):
-    ingredients = RecipeIngredient.objects.filter(
-        recipe__shopping_cart__user=request.user
-    ).values(
-        'ingredient__name', 'ingredient__measurement_unit'
-    ).annotate(amount=Sum('amount'))
-    ingredient_lines = [
-        f"{ingredient_data['ingredient__name']} - "
-        f"{ingredient_data['amount']} "
-        f"{ingredient_data['ingredient__measurement_unit']}"
-        for ingredient_data in ingredients
-    ]
-
-    ingredient_list = "Cписок покупок:\n" + "\n".join(ingredient_lines)
-    file = 'shopping_list'
-    response = HttpResponse(ingredient_list, 'Content-Type: application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{file}.pdf"'
-    return response
@@ -0,0 +1,66 @@
+"""
+PostgreSQL с проверкой соединений и пулом в процессе.
+
+Поверх стандартного бэкенда Django поддерживает ключи DATABASES:
+
+- CONN_HEALTH_CHECKS — перед первым запросом к базе в рамках HTTP-запроса
+  постоянное соединение проверяется SELECT 1 и при ошибке открывается
+  заново (как в Django 4.1);
+- POOL_SIZE и POOL_TIMEOUT — соединения берутся из пула процесса
+  (см. pool.py) и возвращаются в него при закрытии.
+"""
+from functools import partial
+
+from django.db.backends.postgresql import base
+
+from .pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS', False
+        )
+        self.health_check_done = False
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        connect = partial(super().get_new_connection, conn_params)
+        if pool is None:
+            return connect()
+        return pool.getconn(connect)
+
+    def _close(self):
+        pool = self.pool
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+
+    def connect(self):
+        # Свежее соединение проверять незачем; к тому же connect() сам
+        # вызывает ensure_connection() до включения autocommit.
+        self.health_check_done = True
+        super().connect()
+
+    def close_if_unusable_or_obsolete(self):
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and self.health_check_enabled
+            and not self.health_check_done
+            and not self.in_atomic_block
+        ):
+            if not self.is_usable():
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
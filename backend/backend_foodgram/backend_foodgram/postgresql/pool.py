@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_UNKNOWN)
+
+# Сколько последних длительностей выдачи хранить до drain_checkout_waits().
+CHECKOUT_WAITS_KEPT = 10000
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Пул соединений psycopg2 в памяти процесса.
+
+    Открывает не больше max_size соединений; когда свободных нет,
+    ждет возврата до timeout секунд. Свободные соединения выдаются
+    последними вернувшимися первыми и при check_health проверяются
+    запросом SELECT 1. Счетчики для метрик отдает stats(), длительности
+    выдачи по одной — drain_checkout_waits().
+    """
+
+    def __init__(self, max_size, timeout, check_health=True):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_health = check_health
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._counters = dict.fromkeys((
+            'checkouts', 'waits', 'timeouts', 'created', 'discarded',
+        ), 0)
+        self._wait_time = 0.0
+        self._checkout_time = 0.0
+        self._checkout_time_max = 0.0
+        self._checkout_waits = deque(maxlen=CHECKOUT_WAITS_KEPT)
+
+    @staticmethod
+    def is_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._counters['discarded'] += 1
+            self._condition.notify()
+
+    def _take(self, deadline):
+        """Свободное соединение или None, если можно открыть новое."""
+        with self._condition:
+            waited_since = None
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    if waited_since is not None:
+                        self._wait_time += time.monotonic() - waited_since
+                    raise PoolTimeout(
+                        f'Нет свободных соединений в пуле за {self.timeout} с.'
+                    )
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                self._condition.wait(remaining)
+            if waited_since is not None:
+                self._counters['waits'] += 1
+                self._wait_time += time.monotonic() - waited_since
+            if self._idle:
+                return self._idle.pop()
+            self._size += 1
+            return None
+
+    def getconn(self, connect):
+        """Выдает соединение, открывая новое через connect() при нужде."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            try:
+                connection = self._take(deadline)
+            except PoolTimeout:
+                with self._condition:
+                    self._checkout_waits.append(time.monotonic() - start)
+                raise
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._counters['created'] += 1
+                break
+            if not self.check_health or self.is_usable(connection):
+                break
+            self._discard(connection)
+        elapsed = time.monotonic() - start
+        with self._condition:
+            self._counters['checkouts'] += 1
+            self._checkout_time += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+            self._checkout_waits.append(elapsed)
+        return connection
+
+    def putconn(self, connection):
+        """Возвращает соединение, откатив незавершенную транзакцию."""
+        if connection.closed:
+            self._discard(connection)
+            return
+        status = connection.get_transaction_status()
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            self._discard(connection)
+            return
+        if status != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                self._discard(connection)
+                return
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for connection in idle:
+            connection.close()
+
+    def drain_checkout_waits(self):
+        """Длительности выдачи с прошлого вызова, включая таймауты."""
+        with self._condition:
+            waits = list(self._checkout_waits)
+            self._checkout_waits.clear()
+        return waits
+
+    def stats(self):
+        with self._condition:
+            return {
+                'pid': os.getpid(),
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                **self._counters,
+                'wait_time': self._wait_time,
+                'checkout_time': self._checkout_time,
+                'checkout_time_max': self._checkout_time_max,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """
+    Пул текущего процесса для базы alias или None, если он выключен.
+
+    Ключ включает pid, чтобы воркеры после fork не делили сокеты.
+    """
+    max_size = settings_dict.get('POOL_SIZE') or 0
+    if max_size <= 0:
+        return None
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                max_size,
+                settings_dict.get('POOL_TIMEOUT', 10),
+                settings_dict.get('CONN_HEALTH_CHECKS', False),
+            )
+        return _pools[key]
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -42,6 +43,7 @@ DJOSER = {
         'user_create': 'api.serializers.UserRegistrationSerializer',
         'current_user': 'api.serializers.UserSerializer',
         'user': 'api.serializers.UserSerializer',
+        'token': 'api.tokens.AuthTokenSerializer',
     },
     'PERMISSIONS': {
         'current_user': ['rest_framework.permissions.IsAuthenticated'],
@@ -52,6 +54,8 @@ DJOSER = {
 
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.replicas.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'backend_foodgram.urls'
@@ -81,14 +86,72 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend_foodgram.wsgi.application'
 
+# Пул в процессе (backend_foodgram.postgresql) заменяет постоянные
+# соединения: после запроса соединение возвращается в пул.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('ENGINE_DB', 'django.db.backends.postgresql'),
+        'ENGINE': os.getenv('ENGINE_DB', 'backend_foodgram.postgresql'),
         'NAME': os.getenv('DATABASE_NAME', 'foodgram'),
         'USER': os.getenv('DATABASE_USER', 'user'),
         'PASSWORD': os.getenv('DATABASE_PASSWORD', 'mypassword'),
         'HOST': os.getenv('DB_HOST', 'db'),
         'PORT': os.getenv('DATABASE_PORT', '5432'),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL_SIZE else int(os.getenv('CONN_MAX_AGE', 60))
+        ),
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+        ),
+        'POOL_SIZE': DB_POOL_SIZE,
+        'POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        # Для pgbouncer в режиме transaction: именованные курсоры
+        # .iterator() не переживают смену серверного соединения.
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'false').lower()
+            == 'true'
+        ),
+    }
+}
+
+
+# Реплики для чтения: "хост[:порт][/база][@вес]" через запятую.
+REPLICA_WEIGHTS = {}
+for index, replica in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(','))
+):
+    address, _, weight = replica.strip().partition('@')
+    address, _, name = address.partition('/')
+    host, _, port = address.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'NAME': name or DATABASES['default']['NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_WEIGHTS[alias] = int(weight or 1)
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# weighted — случайно с учетом весов, round_robin — по очереди.
+REPLICA_STRATEGY = os.getenv('REPLICA_STRATEGY', 'weighted')
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+REPLICA_PIN_COOKIE = 'db_primary'
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', 30))
+
+# Общий кеш всех процессов (memcached, host:port). Без него кеш
+# в памяти процесса, и кеширование ответов API выключено.
+CACHE_LOCATION = os.getenv('CACHE_LOCATION', '')
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.memcached.PyMemcacheCache'
+            if CACHE_LOCATION
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': CACHE_LOCATION,
     }
 }
 
@@ -131,7 +194,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.tokens.SignedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.timing.TimedJSONRenderer',
+        'api.timing.TimedBrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 10,
@@ -141,3 +208,65 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media'
 
 EMPTY = '-пусто-'
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+SHOPPING_LIST_CACHE_TIMEOUT = int(
+    os.getenv('SHOPPING_LIST_CACHE_TIMEOUT', 60 * 60 * 24)
+)
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 300))
+
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', 10 * 2 ** 20))
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 50_000_000))
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', 2048))
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', 85))
+IMAGE_JOB_MAX_ATTEMPTS = int(os.getenv('IMAGE_JOB_MAX_ATTEMPTS', 5))
+IMAGE_JOB_RETRY_DELAY = int(os.getenv('IMAGE_JOB_RETRY_DELAY', 10))
+IMAGE_JOB_TIMEOUT = int(os.getenv('IMAGE_JOB_TIMEOUT', 300))
+
+TRENDING_WINDOW_DAYS = int(os.getenv('TRENDING_WINDOW_DAYS', 7))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 24))
+
+FEED_HEAD_SIZE = int(os.getenv('FEED_HEAD_SIZE', 100))
+
+# legacy — вход выдает постоянный токен из rest_framework.authtoken,
+# signed — подписанные токены доступа и обновления (simplejwt).
+AUTH_TOKEN_MODE = os.getenv('AUTH_TOKEN_MODE', 'legacy')
+AUTH_LEGACY_TOKENS = os.getenv('AUTH_LEGACY_TOKENS', 'true').lower() == 'true'
+AUTH_REVOCATION_REFRESH = int(os.getenv('AUTH_REVOCATION_REFRESH', 30))
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        minutes=int(os.getenv('AUTH_ACCESS_TOKEN_MINUTES', 15))
+    ),
+    'REFRESH_TOKEN_LIFETIME': timedelta(
+        days=int(os.getenv('AUTH_REFRESH_TOKEN_DAYS', 14))
+    ),
+    'SIGNING_KEY': SECRET_KEY,
+    'AUTH_HEADER_TYPES': ('Token',),
+}
+
+# Доля запросов, время которых пишется в журнал api.timing.
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.getenv('SERVER_TIMING_SAMPLE_RATE', 0.01)
+)
+# Заголовок Server-Timing для всех; сотрудники получают его всегда.
+SERVER_TIMING_HEADER = (
+    os.getenv('SERVER_TIMING_HEADER', 'false').lower() == 'true'
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,99 @@
+"""
+Настройки gunicorn.
+
+Файл подхватывается автоматически при запуске gunicorn из этой папки.
+Режим выбирается переменной GUNICORN_WORKER_CLASS:
+
+- sync (по умолчанию) — WSGI, один запрос на процесс;
+- gthread — WSGI, несколько потоков в процессе;
+- uvicorn — ASGI через uvicorn.workers.UvicornWorker.
+
+Метрики prometheus_client воркеры пишут в файлы папки
+PROMETHEUS_MULTIPROC_DIR; /metrics суммирует их по всем воркерам.
+"""
+
+import math
+import os
+import tempfile
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+
+def available_cpus():
+    """
+    Число ядер, доступных процессу.
+
+    Учитывает привязку к ядрам и квоту CPU контейнера (cgroup v2 и v1),
+    а не все ядра машины, которые видит multiprocessing.cpu_count().
+    """
+    cpus = len(os.sched_getaffinity(0))
+    for path, period_path in (
+        ('/sys/fs/cgroup/cpu.max', None),
+        ('/sys/fs/cgroup/cpu/cpu.cfs_quota_us',
+         '/sys/fs/cgroup/cpu/cpu.cfs_period_us'),
+    ):
+        try:
+            with open(path) as file:
+                quota, *period = file.read().split()
+            if period_path:
+                with open(period_path) as file:
+                    period = file.read().split()
+        except OSError:
+            continue
+        if quota not in ('max', '-1'):
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period[0]))))
+        break
+    return cpus
+
+
+mode = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+if mode not in WORKER_CLASSES:
+    raise RuntimeError(
+        f'GUNICORN_WORKER_CLASS: ожидается одно из {", ".join(WORKER_CLASSES)}'
+    )
+
+worker_class = WORKER_CLASSES[mode]
+wsgi_app = (
+    'backend_foodgram.asgi:application' if mode == 'uvicorn'
+    else 'backend_foodgram.wsgi:application'
+)
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Каждый воркер держит свои соединения с базой и копию приложения.
+workers = int(os.getenv('GUNICORN_WORKERS', 0)) or min(
+    available_cpus() * 2 + 1, int(os.getenv('GUNICORN_MAX_WORKERS', 8))
+)
+threads = int(os.getenv('GUNICORN_THREADS', 4)) if mode == 'gthread' else 1
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Перезапуск воркеров с разбросом, чтобы они не уходили одновременно.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+accesslog = os.getenv('GUNICORN_ACCESSLOG') or None
+
+# Задается до загрузки приложения, чтобы prometheus_client
+# включил файловое хранилище.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'foodgram-metrics')
+)
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def on_starting(server):
+    """Очищает метрики прошлого запуска."""
+    for name in os.listdir(metrics_dir):
+        if name.endswith('.db'):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def child_exit(server, worker):
+    """Убирает показатели завершившегося воркера из живых."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
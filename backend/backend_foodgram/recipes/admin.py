@@ -2,7 +2,8 @@ from django.contrib import admin
 
 from backend_foodgram.settings import EMPTY
 
-from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from .models import (Favorite, ImageJob, Ingredient, Recipe, ShoppingCart,
+                     Tag, TrendingRun)
 
 
 class IngredientsInLine(admin.TabularInline):
@@ -11,11 +12,19 @@ class IngredientsInLine(admin.TabularInline):
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'recipe']
+    list_display = ['id', 'user', 'recipe', 'created']
     search_fields = ['user__username', 'user__email']
     empty_value_display = EMPTY
 
 
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'object_id', 'status', 'attempts',
+                    'run_after']
+    list_filter = ['kind', 'status']
+    empty_value_display = EMPTY
+
+
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'measurement_unit']
@@ -25,7 +34,8 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'author', 'favorites']
+    list_display = ['id', 'name', 'author', 'favorites_count',
+                    'shopping_cart_count']
     search_fields = ['name', 'author__username']
     list_filter = ['tags']
     empty_value_display = EMPTY
@@ -33,15 +43,10 @@ class RecipeAdmin(admin.ModelAdmin):
         IngredientsInLine,
     )
 
-    def favorites(self, obj):
-        if Favorite.objects.filter(recipe=obj).exists():
-            return Favorite.objects.filter(recipe=obj).count()
-        return 0
-
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'recipe']
+    list_display = ['id', 'user', 'recipe', 'created']
     search_fields = ['user__username', 'user__email']
     empty_value_display = EMPTY
 
@@ -51,3 +56,9 @@ class TagAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'slug']
     search_fields = ['name', 'slug']
     empty_value_display = EMPTY
+
+
+@admin.register(TrendingRun)
+class TrendingRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'started', 'duration', 'events', 'recipes']
+    empty_value_display = EMPTY
@@ -0,0 +1,50 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from user.models import FoodgramUser, Subscription
+from .models import Favorite, Recipe, ShoppingCart
+
+# Счетчик: (модель, поле, связанная модель, поле связи).
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+    (FoodgramUser, 'followers_count', Subscription, 'author'),
+    (FoodgramUser, 'recipes_count', Recipe, 'author'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно меняет счетчик объекта на delta, не опуская ниже нуля."""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def counted(related, link):
+    """Подзапрос с числом связанных объектов для каждой строки."""
+    return Coalesce(Subquery(
+        related.objects.filter(**{link: OuterRef('pk')}).order_by().values(
+            link
+        ).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def reconcile_counters(apply=True):
+    """
+    Сверяет счетчики с фактическими данными.
+
+    Возвращает {(модель, поле): число расхождений}; при apply=True
+    исправляет их.
+    """
+    drift = {}
+    for model, field, related, link in COUNTERS:
+        wrong = model.objects.annotate(actual=counted(related, link)).exclude(
+            **{field: F('actual')}
+        )
+        drift[model._meta.model_name, field] = wrong.count()
+        if apply and drift[model._meta.model_name, field]:
+            model.objects.filter(
+                pk__in=wrong.values('pk')
+            ).update(**{field: counted(related, link)})
+    return drift
@@ -1,33 +1,167 @@
 import csv
+import json
+import os
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 from recipes.models import Ingredient
 
+FILE_NAMES = ('ingredients.csv', 'ingredients.json')
+NAME_MAX_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_MAX_LENGTH = Ingredient._meta.get_field('measurement_unit').max_length
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) != 2:
+            yield None
+            continue
+        yield row[0], row[1]
+
+
+def read_json(file):
+    """Потоково читает JSON-массив объектов, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise CommandError('JSON-файл должен содержать массив.')
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise CommandError('Некорректный JSON-файл.')
+                return
+            chunk = file.read(JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = end
+        if isinstance(item, dict):
+            yield item.get('name'), item.get('measurement_unit')
+        else:
+            yield None
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
+
+
+def clean(row):
+    """Возвращает пару (название, единица) или None для плохой строки."""
+    if row is None:
+        return None
+    name, unit = row
+    if not isinstance(name, str) or not isinstance(unit, str):
+        return None
+    name, unit = name.strip(), unit.strip()
+    if not name or not unit:
+        return None
+    if len(name) > NAME_MAX_LENGTH or len(unit) > UNIT_MAX_LENGTH:
+        return None
+    return name, unit
+
 
 class Command(BaseCommand):
-    help = 'Импорт данных из csv Ingredient'
+    help = 'Импорт ингредиентов из ingredients.csv или ingredients.json'
 
     def add_arguments(self, parser):
-        parser.add_argument('--path', type=str, help='Путь к файлу')
+        parser.add_argument(
+            '--path', type=str, default='',
+            help='Путь к файлу или к папке с файлом ingredients.csv/json'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одной пачке вставки'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Проверить файл без записи в базу данных'
+        )
+
+    def get_file_path(self, path):
+        if os.path.isfile(path):
+            return path
+        for file_name in FILE_NAMES:
+            file_path = os.path.join(path, file_name)
+            if os.path.isfile(file_path):
+                return file_path
+        raise CommandError(f'Файл с ингредиентами не найден: {path}')
 
     def handle(self, *args, **options):
-        print('Заполнение модели Ingredient.')
-        file_path = options['path'] + 'ingredients.csv'
-        with open(file_path, 'r') as csv_file:
-            reader = csv.reader(csv_file)
-
-            for row in reader:
-                try:
-                    obj, created = Ingredient.objects.get_or_create(
-                        name=row[0],
-                        measurement_unit=row[1],
-                    )
-                    if not created:
-                        print(
-                            f'Ингредиент {obj} уже существует в базе данных.'
-                        )
-                except Exception as error:
-                    print(f'Ошибка в строке {row}: {error}')
-
-        print('Заполнение завершено.')
+        file_path = self.get_file_path(options['path'])
+        reader = READERS.get(os.path.splitext(file_path)[1].lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы csv и json.')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        dry_run = options['dry_run']
+
+        self.stdout.write(f'Заполнение модели Ingredient из {file_path}.')
+        stats = {'total': 0, 'inserted': 0, 'skipped': 0, 'malformed': 0}
+        # Пары из прошлых пачек: в --dry-run их нет в базе, а без записи
+        # повтор из следующей пачки посчитался бы новым еще раз.
+        seen = set()
+        started = time.monotonic()
+        with open(file_path, 'r', encoding='utf-8') as file:
+            rows = reader(file)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self.process_batch(batch, stats, seen, dry_run)
+        elapsed = time.monotonic() - started
+
+        rate = stats['total'] / elapsed if elapsed else stats['total']
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Проверка завершена' if dry_run else 'Заполнение завершено'}: "
+            f"строк {stats['total']}, добавлено {stats['inserted']}, "
+            f"пропущено {stats['skipped']}, "
+            f"с ошибками {stats['malformed']}, "
+            f"{rate:.0f} строк/с."
+        ))
+
+    def process_batch(self, batch, stats, seen, dry_run):
+        stats['total'] += len(batch)
+        pairs = []
+        for row in batch:
+            pair = clean(row)
+            if pair is None:
+                stats['malformed'] += 1
+            else:
+                pairs.append(pair)
+        unique = set(pairs) - seen
+        stats['skipped'] += len(pairs) - len(unique)
+        if not unique:
+            return
+        seen.update(unique)
+
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in unique}
+        ).values_list('name', 'measurement_unit'))
+        new = unique - existing
+        if new and not dry_run:
+            # ignore_conflicts — на случай параллельного импорта.
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in new],
+                ignore_conflicts=True
+            )
+        stats['inserted'] += len(new)
+        stats['skipped'] += len(unique) - len(new)
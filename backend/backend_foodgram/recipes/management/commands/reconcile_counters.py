@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счетчики избранного, списков покупок, подписчиков '
+        'и рецептов с данными и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = reconcile_counters(apply=not options['dry_run'])
+        for (model, field), count in drift.items():
+            self.stdout.write(f'{model}.{field}: расхождений {count}')
+        total = sum(drift.values())
+        if options['dry_run'] or not total:
+            self.stdout.write(self.style.SUCCESS(
+                f'Всего расхождений: {total}.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено расхождений: {total}.'
+            ))
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_recipe_pub_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipetag',
+            index=models.Index(fields=['tag', 'recipe'], name='recipetag_tag_recipe_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS ingredient_name_pattern_idx '
+        'ON recipes_ingredient (UPPER(name) text_pattern_ops)'
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx '
+        'ON recipes_ingredient USING gin (UPPER(name) gin_trgm_ops)'
+    )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_trgm_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_pattern_idx')
+
+
+class Migration(migrations.Migration):
+    """
+    Индексы для поиска ингредиентов по UPPER(name).
+
+    istartswith и icontains в PostgreSQL сравнивают UPPER(name),
+    поэтому индексы построены по выражению. Триграммный индекс
+    создается, если на сервере доступно расширение pg_trgm.
+    На других СУБД миграция ничего не делает.
+    """
+
+    dependencies = [
+        ('recipes', '0003_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='Время изменения'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Изображение рецепта'), ('avatar', 'Аватар')], max_length=10, verbose_name='Тип')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID объекта')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('processing', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Запустить после')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Взята в работу')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+            ],
+            options={
+                'verbose_name': 'Обработка изображения',
+                'verbose_name_plural': 'Обработка изображений',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('processing', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка')], default='ready', max_length=10, verbose_name='Статус обработки изображения'),
+        ),
+        migrations.AddIndex(
+            model_name='imagejob',
+            index=models.Index(fields=['status', 'run_after'], name='imagejob_status_run_after_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:35
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        "UPDATE recipes_recipe AS recipe SET search_vector = "
+        "setweight(to_tsvector('russian', recipe.name), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(("
+        "SELECT string_agg(tag.name, ' ') FROM recipes_recipetag AS link "
+        "JOIN recipes_tag AS tag ON tag.id = link.tag_id "
+        "WHERE link.recipe_id = recipe.id), '')), 'B') || "
+        "setweight(to_tsvector('russian', coalesce(("
+        "SELECT string_agg(ingredient.name, ' ') "
+        "FROM recipes_recipeingredient AS link "
+        "JOIN recipes_ingredient AS ingredient "
+        "ON ingredient.id = link.ingredient_id "
+        "WHERE link.recipe_id = recipe.id), '')), 'C') || "
+        "setweight(to_tsvector('russian', recipe.text), 'D')"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+    """
+    Поисковый вектор рецептов.
+
+    В PostgreSQL создается GIN-индекс и заполняются векторы
+    существующих рецептов. На других СУБД поле не используется:
+    поиск идет по индексу в памяти (см. api.search).
+    """
+
+    dependencies = [
+        ('recipes', '0006_image_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:39
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def counted(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    User = apps.get_model('user', 'FoodgramUser')
+    Subscription = apps.get_model('user', 'Subscription')
+    Recipe.objects.update(
+        favorites_count=counted(Favorite, 'recipe'),
+        shopping_cart_count=counted(ShoppingCart, 'recipe'),
+    )
+    User.objects.update(
+        followers_count=counted(Subscription, 'author'),
+        recipes_count=counted(Recipe, 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_search_vector'),
+        ('user', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-shopping_cart_count', '-pub_date', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:41
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backdate_existing(apps, schema_editor):
+    # Время добавления старых записей неизвестно: ставим его за окном
+    # трендов, иначе все они засчитаются как только что добавленные.
+    created = django.utils.timezone.now() - timedelta(
+        days=settings.TRENDING_WINDOW_DAYS + 1
+    )
+    for name in ('Favorite', 'ShoppingCart'):
+        apps.get_model('recipes', name).objects.update(created=created)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_popularity_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingRecipe',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в тренде',
+                'verbose_name_plural': 'Рецепты в тренде',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started', models.DateTimeField(verbose_name='Начало')),
+                ('duration', models.FloatField(verbose_name='Длительность, с')),
+                ('events', models.PositiveIntegerField(verbose_name='Обработано событий')),
+                ('recipes', models.PositiveIntegerField(verbose_name='Рецептов в рейтинге')),
+            ],
+            options={
+                'verbose_name': 'Пересчет трендов',
+                'verbose_name_plural': 'Пересчеты трендов',
+                'ordering': ('-started',),
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backdate_existing, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['created'], name='favorite_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['created'], name='shoppingcart_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trendingrecipe',
+            index=models.Index(fields=['-score', '-recipe'], name='trending_score_idx'),
+        ),
+    ]
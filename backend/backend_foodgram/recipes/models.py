@@ -1,7 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.db.models import UniqueConstraint
+from django.utils import timezone
+
+from user.models import IMAGE_PENDING, IMAGE_READY, IMAGE_STATUS_CHOICES
 
 User = get_user_model()
 
@@ -63,6 +67,12 @@ class Recipe(models.Model):
         'Изображение',
         upload_to='recipes/images/'
     )
+    image_status = models.CharField(
+        'Статус обработки изображения',
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_READY,
+    )
     name = models.CharField('Название рецепта', max_length=200)
     text = models.TextField(
         'Описание рецепта',
@@ -78,11 +88,45 @@ class Recipe(models.Model):
         'Время публикации',
         auto_now_add=True,
     )
+    modified = models.DateTimeField(
+        'Время изменения',
+        auto_now=True,
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-shopping_cart_count',
+                        '-pub_date', '-id'],
+                name='recipe_popular_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -134,6 +178,12 @@ class RecipeTag(models.Model):
                 name='recipe_tag_unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'],
+                name='recipetag_tag_recipe_idx'
+            ),
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -150,8 +200,12 @@ class ShoppingCart(models.Model):
         verbose_name='Рецепт',
         related_name='shopping_cart',
     )
+    created = models.DateTimeField('Добавлено', auto_now_add=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['created'], name='shoppingcart_created_idx'),
+        ]
         constraints = [
             UniqueConstraint(
                 fields=['user', 'recipe'],
@@ -174,11 +228,90 @@ class Favorite(models.Model):
         verbose_name='Рецепт',
         related_name='favorites',
     )
+    created = models.DateTimeField('Добавлено', auto_now_add=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['created'], name='favorite_created_idx'),
+        ]
         constraints = [
             UniqueConstraint(
                 fields=['user', 'recipe'],
                 name='user_favorite_unique'
             )
         ]
+
+
+class TrendingRecipe(models.Model):
+    """Рейтинг рецепта за последние дни, пересчитывается командой."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField('Рейтинг')
+
+    class Meta:
+        verbose_name = 'Рецепт в тренде'
+        verbose_name_plural = 'Рецепты в тренде'
+        indexes = [
+            models.Index(
+                fields=['-score', '-recipe'],
+                name='trending_score_idx'
+            ),
+        ]
+
+
+class TrendingRun(models.Model):
+    """Запуск пересчета трендов: сколько длился и сколько обработал."""
+
+    started = models.DateTimeField('Начало')
+    duration = models.FloatField('Длительность, с')
+    events = models.PositiveIntegerField('Обработано событий')
+    recipes = models.PositiveIntegerField('Рецептов в рейтинге')
+
+    class Meta:
+        ordering = ('-started',)
+        verbose_name = 'Пересчет трендов'
+        verbose_name_plural = 'Пересчеты трендов'
+
+
+class ImageJob(models.Model):
+    """Задача фоновой обработки изображения рецепта или аватара."""
+
+    RECIPE = 'recipe'
+    AVATAR = 'avatar'
+
+    kind = models.CharField(
+        'Тип',
+        max_length=10,
+        choices=[(RECIPE, 'Изображение рецепта'), (AVATAR, 'Аватар')]
+    )
+    object_id = models.PositiveBigIntegerField('ID объекта')
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    run_after = models.DateTimeField('Запустить после', default=timezone.now)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Обработка изображения'
+        verbose_name_plural = 'Обработка изображений'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'],
+                name='imagejob_status_run_after_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id}'
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.models import FoodgramUser, Subscription
+from .counters import change_counter
+from .models import Favorite, Recipe, ShoppingCart
+
+# Модель связи -> (модель со счетчиком, поле связи, поле счетчика).
+COUNTED = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'shopping_cart_count'),
+    Subscription: (FoodgramUser, 'author_id', 'followers_count'),
+    Recipe: (FoodgramUser, 'author_id', 'recipes_count'),
+}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_save, sender=Recipe)
+def increment_counter(sender, instance, created, raw=False, **kwargs):
+    """Увеличивает счетчик в той же транзакции, что и создание связи."""
+    if created and not raw:
+        model, link, field = COUNTED[sender]
+        change_counter(model, getattr(instance, link), field, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_delete, sender=Recipe)
+def decrement_counter(sender, instance, **kwargs):
+    model, link, field = COUNTED[sender]
+    change_counter(model, getattr(instance, link), field, -1)
@@ -7,7 +7,8 @@ from user.models import Subscription, FoodgramUser
 
 @admin.register(FoodgramUser)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ['username', 'email', 'first_name', 'last_name']
+    list_display = ['username', 'email', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count']
     search_fields = ['username', 'email']
     list_filter = ['username', 'email']
     ordering = ['username']
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='avatar_status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('processing', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка')], default='ready', max_length=10, verbose_name='Статус обработки аватара'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_avatar_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчики'),
+        ),
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецепты'),
+        ),
+    ]
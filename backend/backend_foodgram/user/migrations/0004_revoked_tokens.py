@@ -0,0 +1,25 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=64, unique=True, verbose_name='Идентификатор')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Истекает')),
+            ],
+            options={
+                'verbose_name': 'Отозванный токен',
+                'verbose_name_plural': 'Отозванные токены',
+            },
+        ),
+    ]
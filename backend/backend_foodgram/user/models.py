@@ -3,6 +3,17 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db.models import UniqueConstraint
 
+IMAGE_PENDING = 'pending'
+IMAGE_PROCESSING = 'processing'
+IMAGE_READY = 'ready'
+IMAGE_FAILED = 'failed'
+IMAGE_STATUS_CHOICES = [
+    (IMAGE_PENDING, 'В очереди'),
+    (IMAGE_PROCESSING, 'Обрабатывается'),
+    (IMAGE_READY, 'Готово'),
+    (IMAGE_FAILED, 'Ошибка'),
+]
+
 
 class FoodgramUser(AbstractUser):
     USERNAME_FIELD = "email"
@@ -43,6 +54,22 @@ class FoodgramUser(AbstractUser):
         blank=True,
         null=True
     )
+    avatar_status = models.CharField(
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_READY,
+        verbose_name="Статус обработки аватара"
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Подписчики"
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Рецепты"
+    )
     following = models.ManyToManyField(
 
         'self',
@@ -56,6 +83,17 @@ class FoodgramUser(AbstractUser):
         verbose_name_plural = "Пользователи"
         ordering = ("username",)
 
+    def refresh_from_db(self, using=None, fields=None):
+        """
+        Обращение к отложенному полю загружает все отложенные поля разом:
+        пользователь из подписанного токена (api.tokens) приходит только
+        с id, username и флагами доступа.
+        """
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields)
+
     def is_admin(self):
         return self.role == 'admin' or self.is_staff
 
@@ -91,3 +129,24 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f'Пользователь {self.user} подписался на {self.author}'
+
+
+class RevokedToken(models.Model):
+    """Отозванная сессия подписанных токенов: jti токена обновления."""
+
+    jti = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="Идентификатор"
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        verbose_name="Истекает"
+    )
+
+    class Meta:
+        verbose_name = "Отозванный токен"
+        verbose_name_plural = "Отозванные токены"
+
+    def __str__(self):
+        return self.jti